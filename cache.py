@@ -0,0 +1,58 @@
+import hashlib
+import os
+import re
+
+CACHE_DIR = os.environ.get(
+    "WALLRACERS_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+)
+
+
+def digest(*parts):
+    """Short stable hash of arrays, numbers, strings and nested tuples."""
+    h = hashlib.sha1()
+    for part in parts:
+        if hasattr(part, "tobytes"):
+            h.update(str(part.shape).encode())
+            h.update(part.tobytes())
+        else:
+            h.update(repr(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def entry_path(kind, name, key, ext):
+    """Where an entry lives. name may be anything, e.g. a track file's own
+    name: it is reduced to a safe slug plus a hash of the original, so
+    entries stay inside the cache and distinct names never collide."""
+    slug = re.sub(r"[^0-9A-Za-z]+", "_", str(name)).strip("_")[:32]
+    return os.path.join(CACHE_DIR, kind, f"{slug}_{digest(name)[:6]}-{key}{ext}")
+
+
+def read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write(path, data):
+    """Atomically store data, replacing older entries with the same name.
+
+    The cache is best-effort: a read-only or full disk just means the
+    entry gets rebuilt next time.
+    """
+    folder, fname = os.path.split(path)
+    name = fname.rsplit("-", 1)[0]
+    try:
+        os.makedirs(folder, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        for other in os.listdir(folder):
+            if other.rsplit("-", 1)[0] == name and other != fname and not other.endswith(".tmp"):
+                os.remove(os.path.join(folder, other))
+    except OSError:
+        pass
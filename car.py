@@ -1,118 +1,110 @@
-import math
 import os
 import random
+from functools import partial
 import pygame
 import numpy as np
 
+from effects import add_glow
+from sim import CarState
+
 PLAYER_COLORS = [(255, 50, 50), (50, 100, 255), (50, 255, 50), (255, 200, 50)]
 
 _ASSET_DIR = os.path.join(os.path.dirname(__file__), "assets")
 _CAR_FILES = ["car_red.png", "car_blue.png", "car_green.png", "car_orange.png"]
+# Spacing of boost trail dots behind the car, in pixels
+TRAIL_STEP = 20
+# Headings baked per sprite; cars snap to the nearest one when drawn
+ROTATION_STEPS = 120
 
+# Default sprites and their rotations, shared by every car of a color
+_default_looks = {}
+_oil_splat = None
 
-class Car:
-    def __init__(self, player_id, track, sprite=None):
-        self.player_id = player_id
-        self.track = track
-        self.lane = 1
-        self.waypoint_idx = player_id * 20
-        self.base_speed = 3.0 + random.uniform(-0.15, 0.15)
-        self.speed = self.base_speed
-        self.boost_charges = 0
-        self.boost_timer = 0.0
-        self.slow_timer = 0.0
-        self.has_shield = False
-        self.lap = 0
-        self.finished = False
-        self.finish_time = None
-        self.sprite = sprite or _default_sprite(player_id)
-        pos = track.lanes[self.lane][self.waypoint_idx % track.num_waypoints]
-        self.pos = [pos[0], pos[1]]
-        self.angle = 0.0
-
-    def update(self, dt):
-        if self.finished:
-            return
-        if self.boost_timer > 0:
-            self.boost_timer = max(0, self.boost_timer - dt)
-            self.speed = self.base_speed * 2.0
-        elif self.slow_timer > 0:
-            self.slow_timer = max(0, self.slow_timer - dt)
-            self.speed = self.base_speed * 0.5
+
+class Car(CarState):
+    def __init__(self, player_id, track, sprite=None, fleet=None, rng=random):
+        super().__init__(player_id, track, rng, fleet)
+        if sprite is None:
+            self.sprite, self.rotations = _default_look(player_id)
         else:
-            self.speed = self.base_speed
-
-        lane = self.track.lanes[self.lane]
-        n = self.track.num_waypoints
-        remaining = self.speed * dt * 60
-
-        while remaining > 0.01:
-            next_idx = (self.waypoint_idx + 1) % n
-            tx, ty = lane[next_idx]
-            dx, dy = tx - self.pos[0], ty - self.pos[1]
-            dist = math.hypot(dx, dy)
-            if dist < 0.01:
-                self.waypoint_idx = next_idx
-                continue
-            if dist <= remaining:
-                self.pos[0], self.pos[1] = tx, ty
-                old = self.waypoint_idx
-                self.waypoint_idx = next_idx
-                remaining -= dist
-                if next_idx < old:
-                    self.lap += 1
-            else:
-                frac = remaining / dist
-                self.pos[0] += dx * frac
-                self.pos[1] += dy * frac
-                remaining = 0
-
-        nxt = lane[(self.waypoint_idx + 1) % n]
-        self.angle = math.degrees(math.atan2(-(nxt[1] - self.pos[1]), nxt[0] - self.pos[0])) - 90
-
-    def switch_lane(self):
-        self.lane = (self.lane + 1) % 3
-
-    def activate_boost(self):
-        if self.boost_charges > 0 and self.boost_timer <= 0:
-            self.boost_charges -= 1
-            self.boost_timer = 2.5
-            return True
-        return False
-
-    def render(self, surface):
-        rotated = pygame.transform.rotate(self.sprite, self.angle)
-        rect = rotated.get_rect(center=(int(self.pos[0]), int(self.pos[1])))
-        # Shadow under car
-        shadow = pygame.Surface((40, 40), pygame.SRCALPHA)
-        pygame.draw.ellipse(shadow, (0, 0, 0, 60), (0, 5, 40, 30))
-        sh_rot = pygame.transform.rotate(shadow, self.angle)
-        sh_rect = sh_rot.get_rect(center=(int(self.pos[0]) + 2, int(self.pos[1]) + 2))
-        surface.blit(sh_rot, sh_rect)
-        surface.blit(rotated, rect)
+            self.sprite, self.rotations = sprite, SpriteRotations(sprite)
+
+    def render(self, surface, alpha=1.0, glow=None):
+        """Draw the car alpha of the way from its previous to its current pose.
+
+        Boost and shield glows go into glow (a GlowLayer) when given, or are
+        added straight onto surface. Returns the rect covering it all.
+        """
+        add = glow.add if glow is not None else partial(add_glow, surface)
+        x, y, angle = self.pose_at(alpha)
+        x, y = int(x), int(y)
+        frame, (ox, oy) = self.rotations.at(angle)
+        drawn = surface.blit(frame, (x + ox, y + oy))
         if self.boost_timer > 0:
-            # Glowing boost trail
-            n = self.track.num_waypoints
+            # Glowing boost trail, held back to match the interpolated car
+            behind = self.distance - (1 - alpha) * self.speed
             for j in range(1, 6):
-                idx = (self.waypoint_idx - j * 3) % n
-                pt = self.track.lanes[self.lane][idx]
-                alpha = max(0, 200 - j * 40)
+                pt = self.track.point_at(self.lane, behind - j * TRAIL_STEP)
+                fade = max(0, 200 - j * 40)
                 r = max(1, 6 - j)
-                glow = pygame.Surface((r * 4, r * 4), pygame.SRCALPHA)
-                pygame.draw.circle(glow, (255, 200, 50, alpha), (r * 2, r * 2), r * 2)
-                surface.blit(glow, (int(pt[0]) - r * 2, int(pt[1]) - r * 2))
+                drawn.union_ip(add(pt[0], pt[1], r * 2, (255, 200, 50), fade))
         if self.has_shield:
             # Animated shield glow
-            glow = pygame.Surface((70, 70), pygame.SRCALPHA)
-            pygame.draw.circle(glow, (80, 140, 255, 80), (35, 35), 32)
-            pygame.draw.circle(glow, (120, 180, 255, 50), (35, 35), 28)
-            surface.blit(glow, (int(self.pos[0]) - 35, int(self.pos[1]) - 35))
-            pygame.draw.circle(surface, (150, 200, 255), (int(self.pos[0]), int(self.pos[1])), 30, 2)
+            drawn.union_ip(add(x, y, 32, (80, 140, 255), 80))
+            add(x, y, 28, (120, 180, 255), 50)
+            pygame.draw.circle(surface, (150, 200, 255), (x, y), 30, 2)
         if self.slow_timer > 0:
             # Oil splat visual on car
-            glow = pygame.Surface((50, 50), pygame.SRCALPHA)
-            pygame.draw.circle(glow, (80, 60, 20, 100), (25, 25), 20)
-            surface.blit(glow, (int(self.pos[0]) - 25, int(self.pos[1]) - 25))
+            drawn.union_ip(surface.blit(_splat(), (x - 25, y - 25)))
+        return drawn
+
+
+class SpriteRotations:
+    """A car sprite pre-rotated to ROTATION_STEPS headings, shadow included.
+
+    Built once per car so drawing is a table lookup and one blit instead
+    of two rotations and a fresh shadow surface every frame.
+    """
+
+    def __init__(self, sprite, steps=ROTATION_STEPS):
+        self.steps = steps
+        shadow = pygame.Surface((40, 40), pygame.SRCALPHA)
+        pygame.draw.ellipse(shadow, (0, 0, 0, 60), (0, 5, 40, 30))
+        convert = pygame.display.get_surface() is not None
+        self.frames = []
+        for i in range(steps):
+            angle = i * 360 / steps
+            car = pygame.transform.rotate(sprite, angle)
+            sh = pygame.transform.rotate(shadow, angle)
+            # Shadow sits 2px down and right of the car
+            w = max(car.get_width(), sh.get_width() + 4)
+            h = max(car.get_height(), sh.get_height() + 4)
+            frame = pygame.Surface((w, h), pygame.SRCALPHA)
+            frame.blit(sh, sh.get_rect(center=(w // 2 + 2, h // 2 + 2)))
+            frame.blit(car, car.get_rect(center=(w // 2, h // 2)))
+            if convert:
+                frame = frame.convert_alpha()
+            self.frames.append((frame, (-(w // 2), -(h // 2))))
+
+    def at(self, angle):
+        """(surface, top-left offset from the car's center) nearest angle."""
+        return self.frames[round(angle * self.steps / 360) % self.steps]
+
+
+def _splat():
+    global _oil_splat
+    if _oil_splat is None:
+        _oil_splat = pygame.Surface((50, 50), pygame.SRCALPHA)
+        pygame.draw.circle(_oil_splat, (80, 60, 20, 100), (25, 25), 20)
+    return _oil_splat
+
+
+def _default_look(pid):
+    key = pid % len(_CAR_FILES)
+    if key not in _default_looks:
+        sprite = _default_sprite(key)
+        _default_looks[key] = (sprite, SpriteRotations(sprite))
+    return _default_looks[key]
 
 
 def _default_sprite(pid):
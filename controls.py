@@ -1,5 +1,7 @@
 import pygame
 
+from race import TOTAL_LAPS  # noqa: F401 - kept here for existing imports
+
 PLAYER_KEYS = {
     0: {"lane": pygame.K_q, "boost": pygame.K_w, "honk": pygame.K_e},
     1: {"lane": pygame.K_i, "boost": pygame.K_o, "honk": pygame.K_p},
@@ -8,7 +10,13 @@ PLAYER_KEYS = {
 }
 
 SCAN_KEY = pygame.K_SPACE
+# Shows and hides the frame-time profiler overlay
+PROFILE_KEY = pygame.K_F3
 NUM_PLAYERS = 4
 WIDTH, HEIGHT = 1920, 1080
+# Frame cap for drawing only; the simulation runs at its own fixed rate
+# (sim.TICK), so this can follow the projector's refresh rate
 FPS = 60
-TOTAL_LAPS = 5
+# Redraw and present only the parts of the screen that changed while
+# racing; helps on machines where full-screen blits and flips are slow
+DIRTY_RECTS = False
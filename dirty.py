@@ -0,0 +1,67 @@
+import pygame
+
+# Dirty areas are snapped to tiles this many pixels square, which keeps the
+# rect list short however many small things were drawn
+DIRTY_TILE = 64
+# Past this fraction of the screen a full flip is cheaper than updating rects
+DIRTY_FLIP_THRESHOLD = 0.4
+
+
+class DirtyRects:
+    """Works out which parts of the screen changed between two frames.
+
+    Each frame, whatever was drawn last frame is restored from the
+    background (stale), everything is drawn again, and frame() is handed
+    the rects that drawing touched. It returns the tile rects to pass to
+    pygame.display.update, or None when a full flip is due.
+    """
+
+    def __init__(self, size, tile=DIRTY_TILE, threshold=DIRTY_FLIP_THRESHOLD):
+        self.tile = tile
+        self.cols = -(-size[0] // tile)
+        self.rows = -(-size[1] // tile)
+        self.threshold = threshold
+        # None until a full frame has been shown, meaning restore everything
+        self.stale = None
+
+    def invalidate(self):
+        """Forget the last frame, e.g. after something else drew the screen."""
+        self.stale = None
+
+    def frame(self, drawn):
+        now = self._cells(drawn)
+        full = self.stale is None
+        cells = now if full else now | self._cells(self.stale)
+        self.stale = self._runs(now)
+        if full or len(cells) > self.threshold * self.cols * self.rows:
+            return None
+        return self._runs(cells)
+
+    def _cells(self, rects):
+        t = self.tile
+        cells = set()
+        for r in rects:
+            if not r:
+                continue
+            x0, x1 = max(r.left // t, 0), min((r.right - 1) // t, self.cols - 1)
+            y0, y1 = max(r.top // t, 0), min((r.bottom - 1) // t, self.rows - 1)
+            for ty in range(y0, y1 + 1):
+                for tx in range(x0, x1 + 1):
+                    cells.add((ty, tx))
+        return cells
+
+    def _runs(self, cells):
+        """Join horizontally adjacent tiles into one rect per run."""
+        t = self.tile
+        rects = []
+        start = prev = None
+        for ty, tx in sorted(cells):
+            if prev is not None and (ty, tx) == (prev[0], prev[1] + 1):
+                prev = (ty, tx)
+                continue
+            if prev is not None:
+                rects.append(pygame.Rect(start[1] * t, start[0] * t, (prev[1] - start[1] + 1) * t, t))
+            start = prev = (ty, tx)
+        if prev is not None:
+            rects.append(pygame.Rect(start[1] * t, start[0] * t, (prev[1] - start[1] + 1) * t, t))
+        return rects
@@ -1,92 +1,273 @@
 import pygame
 import random
 import math
+import sys
+from collections import OrderedDict
 
+import numpy as np
 
-class Particle:
-    __slots__ = ("x", "y", "vx", "vy", "life", "max_life", "color", "size")
+from dirty import DIRTY_TILE
+from profiler import surface_made
 
-    def __init__(self, x, y, vx, vy, life, color, size=3):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.life = life
-        self.max_life = life
-        self.color = color
-        self.size = size
+# Glow opacity levels that get their own stamp; effects snap to the nearest
+GLOW_ALPHA_STEPS = 16
+# Glow stamps kept, least recently used dropped first
+GLOW_STAMP_CACHE = 256
+# Live particles a ParticleSystem holds; past this the oldest are dropped
+MAX_PARTICLES = 32768
+# Largest particle radius emitted
+MAX_PARTICLE_SIZE = 6
+
+_stamps = OrderedDict()
+# Pixel offsets of a filled disc of each radius, drawn like pygame.draw.circle
+_DISCS = [None] + [
+    np.argwhere(np.add.outer(np.arange(-r, r + 1) ** 2, np.arange(-r, r + 1) ** 2) < r * r) - r
+    for r in range(1, MAX_PARTICLE_SIZE + 1)
+]
 
 
 class ParticleSystem:
-    def __init__(self):
-        self.particles = []
+    """Particles as parallel NumPy arrays, updated and drawn in bulk.
+
+    Live particles are kept packed at the front of the arrays in the order
+    they were emitted; dead ones are squeezed out each update.
+    """
+
+    def __init__(self, rng=random, capacity=MAX_PARTICLES):
+        self.rng = rng
+        self.capacity = capacity
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity)
+        self.max_life = np.ones(capacity)
+        self.color = np.zeros(capacity, dtype=np.intp)
+        self.size = np.zeros(capacity)
+        # Colors particles are drawn in; color holds indices into this
+        self.palette = []
+        self._palette_idx = {}
+        self._columns = (self.x, self.y, self.vx, self.vy, self.life, self.max_life, self.color, self.size)
+
+    def __len__(self):
+        return self.count
+
+    def _add(self, x, y, vx, vy, life, colors, sizes):
+        n = len(vx)
+        if self.count + n > self.capacity:
+            self._drop_oldest(self.count + n - self.capacity)
+        s = slice(self.count, self.count + n)
+        self.x[s] = x
+        self.y[s] = y
+        self.vx[s] = vx
+        self.vy[s] = vy
+        self.life[s] = life
+        self.max_life[s] = life
+        self.color[s] = [self._color_index(c) for c in colors]
+        self.size[s] = sizes
+        self.count += n
+
+    def _drop_oldest(self, k):
+        k = min(k, self.count)
+        for col in self._columns:
+            col[:self.count - k] = col[k:self.count]
+        self.count -= k
+
+    def _color_index(self, color):
+        idx = self._palette_idx.get(color)
+        if idx is None:
+            idx = self._palette_idx[color] = len(self.palette)
+            self.palette.append(color)
+        return idx
 
     def emit_boost(self, x, y, angle_deg):
         rad = math.radians(angle_deg + 90)
+        vx, vy, life, colors, sizes = [], [], [], [], []
         for _ in range(3):
-            spread = random.uniform(-0.5, 0.5)
-            speed = random.uniform(1.5, 3.5)
-            vx = math.cos(rad + spread) * speed
-            vy = math.sin(rad + spread) * speed
-            color = random.choice([
+            spread = self.rng.uniform(-0.5, 0.5)
+            speed = self.rng.uniform(1.5, 3.5)
+            vx.append(math.cos(rad + spread) * speed)
+            vy.append(math.sin(rad + spread) * speed)
+            colors.append(self.rng.choice([
                 (255, 200, 50), (255, 150, 30), (255, 100, 20), (255, 255, 100)
-            ])
-            self.particles.append(Particle(x, y, vx, vy, random.uniform(0.2, 0.5), color, random.randint(2, 5)))
+            ]))
+            life.append(self.rng.uniform(0.2, 0.5))
+            sizes.append(self.rng.randint(2, 5))
+        self._add(x, y, vx, vy, life, colors, sizes)
+
+    def _burst(self, x, y, n, speeds, lives, colors, sizes):
+        """n particles flying out in random directions from (x, y)."""
+        vx, vy, life, cols, size = [], [], [], [], []
+        for _ in range(n):
+            angle = self.rng.uniform(0, math.pi * 2)
+            speed = self.rng.uniform(*speeds)
+            vx.append(math.cos(angle) * speed)
+            vy.append(math.sin(angle) * speed)
+            life.append(self.rng.uniform(*lives))
+            cols.append(self.rng.choice(colors))
+            size.append(self.rng.randint(*sizes))
+        self._add(x, y, vx, vy, life, cols, size)
 
     def emit_oil_hit(self, x, y):
-        for _ in range(12):
-            angle = random.uniform(0, math.pi * 2)
-            speed = random.uniform(1, 4)
-            self.particles.append(Particle(
-                x, y,
-                math.cos(angle) * speed, math.sin(angle) * speed,
-                random.uniform(0.3, 0.6),
-                random.choice([(60, 40, 20), (80, 60, 30), (40, 30, 15)]),
-                random.randint(2, 4),
-            ))
+        self._burst(x, y, 12, (1, 4), (0.3, 0.6),
+                    [(60, 40, 20), (80, 60, 30), (40, 30, 15)], (2, 4))
 
     def emit_pickup(self, x, y, color):
-        for _ in range(8):
-            angle = random.uniform(0, math.pi * 2)
-            speed = random.uniform(1, 3)
-            self.particles.append(Particle(
-                x, y,
-                math.cos(angle) * speed, math.sin(angle) * speed,
-                random.uniform(0.2, 0.5),
-                color,
-                random.randint(2, 4),
-            ))
+        self._burst(x, y, 8, (1, 3), (0.2, 0.5), [color], (2, 4))
 
     def emit_finish(self, x, y):
-        for _ in range(30):
-            angle = random.uniform(0, math.pi * 2)
-            speed = random.uniform(2, 6)
-            color = random.choice([
-                (255, 215, 0), (255, 255, 255), (255, 100, 100),
-                (100, 200, 255), (100, 255, 100),
-            ])
-            self.particles.append(Particle(
-                x, y,
-                math.cos(angle) * speed, math.sin(angle) * speed,
-                random.uniform(0.5, 1.5),
-                color,
-                random.randint(3, 6),
-            ))
+        self._burst(x, y, 30, (2, 6), (0.5, 1.5), [
+            (255, 215, 0), (255, 255, 255), (255, 100, 100),
+            (100, 200, 255), (100, 255, 100),
+        ], (3, 6))
 
     def update(self, dt):
-        alive = []
-        for p in self.particles:
-            p.life -= dt
-            if p.life > 0:
-                p.x += p.vx
-                p.y += p.vy
-                p.vy += 0.5 * dt  # slight gravity
-                alive.append(p)
-        self.particles = alive
+        n = self.count
+        life = self.life[:n]
+        life -= dt
+        alive = life > 0
+        m = int(np.count_nonzero(alive))
+        if m < n:
+            for col in self._columns:
+                col[:m] = col[:n][alive]
+            self.count = n = m
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.vy[:n] += 0.5 * dt  # slight gravity
 
     def render(self, surface):
-        for p in self.particles:
-            alpha = p.life / p.max_life
-            size = max(1, int(p.size * alpha))
-            color = tuple(int(c * alpha) for c in p.color)
-            pygame.draw.circle(surface, color, (int(p.x), int(p.y)), size)
+        """Draw every particle straight into the surface's pixels.
+
+        Particles shrink and darken as they age. Discs are drawn largest
+        first, so small sparks aren't buried under big ones; within a size
+        they keep emission order. Returns the DIRTY_TILE rects drawn to.
+        """
+        n = self.count
+        if not n:
+            return []
+        fade = self.life[:n] / self.max_life[:n]
+        radius = np.maximum(1, (self.size[:n] * fade).astype(int))
+        x = self.x[:n].astype(int)
+        y = self.y[:n].astype(int)
+        rgb = (np.array(self.palette, dtype=np.float64)[self.color[:n]] * fade[:, None]).astype(np.uint32)
+        mapped = pygame.surfarray.map_array(surface, rgb)
+        w, h = surface.get_size()
+        depth = surface.get_bytesize()
+        buffer = surface.get_buffer()
+        if depth == 3:
+            # Packed 24-bit pixels are written one byte plane at a time
+            step, row = 3, surface.get_pitch()
+            shifts = range(0, 24, 8) if sys.byteorder == "little" else range(16, -8, -8)
+            planes = [(np.frombuffer(buffer, dtype=np.uint8, offset=k), (mapped >> s & 0xFF).astype(np.uint8))
+                      for k, s in enumerate(shifts)]
+        else:
+            dtype = np.dtype("u%d" % depth)
+            step, row = 1, surface.get_pitch() // depth
+            planes = [(np.frombuffer(buffer, dtype=dtype), mapped.astype(dtype))]
+        for r in range(MAX_PARTICLE_SIZE, 0, -1):
+            sel = np.flatnonzero(radius == r)
+            if not len(sel):
+                continue
+            disc = _DISCS[r]
+            offsets = disc[:, 0] * step + disc[:, 1] * row
+            xs, ys = x[sel], y[sel]
+            inner = (xs >= r) & (xs < w - r) & (ys >= r) & (ys < h - r)
+            # Discs clear of the edges are written as whole blocks of offsets
+            index = ((xs[inner] * step + ys[inner] * row)[:, None] + offsets).ravel()
+            for pixels, color in planes:
+                pixels[index] = np.repeat(color[sel[inner]], len(disc))
+            edge = ~inner
+            if edge.any():
+                px = (xs[edge, None] + disc[:, 0]).ravel()
+                py = (ys[edge, None] + disc[:, 1]).ravel()
+                keep = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+                index = px[keep] * step + py[keep] * row
+                for pixels, color in planes:
+                    pixels[index] = np.repeat(color[sel[edge]], len(disc))[keep]
+        del buffer, planes
+        return _tiles(x, y, radius, w, h)
+
+
+def _tiles(x, y, radius, w, h):
+    """DIRTY_TILE rects covering discs of radius at (x, y)."""
+    t = DIRTY_TILE
+    cols, rows = -(-w // t), -(-h // t)
+    used = np.zeros((rows, cols), dtype=bool)
+    for dx in (-1, 1):
+        for dy in (-1, 1):
+            tx = np.clip((x + dx * radius) // t, 0, cols - 1)
+            ty = np.clip((y + dy * radius) // t, 0, rows - 1)
+            used[ty, tx] = True
+    return [pygame.Rect(tx * t, ty * t, t, t) for ty, tx in np.argwhere(used).tolist()]
+
+
+def glow_stamp(radius, color, alpha=255, width=0):
+    """Cached RGB stamp of a circle (or ring, if width) for additive blits.
+
+    The color is premultiplied by alpha on black, so adding the stamp to a
+    surface looks like blending a translucent circle onto it.
+    """
+    level = round(alpha * (GLOW_ALPHA_STEPS - 1) / 255)
+    key = (radius, color, level, width)
+    stamp = _stamps.get(key)
+    if stamp is not None:
+        _stamps.move_to_end(key)
+        return stamp
+    k = level / (GLOW_ALPHA_STEPS - 1)
+    stamp = pygame.Surface((radius * 2 + 2, radius * 2 + 2))
+    surface_made()
+    pygame.draw.circle(stamp, tuple(int(c * k) for c in color), (radius + 1, radius + 1), radius, width)
+    _stamps[key] = stamp
+    if len(_stamps) > GLOW_STAMP_CACHE:
+        _stamps.popitem(last=False)
+    return stamp
+
+
+def add_glow(surface, x, y, radius, color, alpha=255, width=0):
+    """Add a glow straight onto surface, without a GlowLayer; returns its rect."""
+    return surface.blit(glow_stamp(radius, color, alpha, width), (int(x) - radius - 1, int(y) - radius - 1),
+                 special_flags=pygame.BLEND_RGB_ADD)
+
+
+class GlowLayer:
+    """One reusable screen-sized layer that a frame's glows are added into.
+
+    Only the areas glows were drawn to are composited onto the screen, and
+    the layer is cleared by subtracting the same stamps again, so a quiet
+    frame costs nothing.
+    """
+
+    def __init__(self, size):
+        self.layer = pygame.Surface(size)
+        self.stamps = []
+
+    def add(self, x, y, radius, color, alpha=255, width=0):
+        stamp = glow_stamp(radius, color, alpha, width)
+        pos = (int(x) - radius - 1, int(y) - radius - 1)
+        self.stamps.append((stamp, pos))
+        return self.layer.blit(stamp, pos, special_flags=pygame.BLEND_RGB_ADD)
+
+    def composite(self, surface):
+        """Add the layer onto surface; returns the rects composited."""
+        rects = _disjoint([stamp.get_rect(topleft=pos) for stamp, pos in self.stamps])
+        for rect in rects:
+            surface.blit(self.layer, rect, rect, special_flags=pygame.BLEND_RGB_ADD)
+        # Subtraction saturates at zero, so this clears even where adds clipped
+        for stamp, pos in self.stamps:
+            self.layer.blit(stamp, pos, special_flags=pygame.BLEND_RGB_SUB)
+        self.stamps.clear()
+        return rects
+
+
+def _disjoint(rects):
+    """Merge overlapping rects, so no area is composited twice."""
+    merged = []
+    for rect in rects:
+        hits = rect.collidelistall(merged)
+        while hits:
+            for i in reversed(hits):
+                rect.union_ip(merged.pop(i))
+            hits = rect.collidelistall(merged)
+        merged.append(rect)
+    return merged
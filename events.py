@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+
+TELEMETRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "telemetry")
+# Events kept per session; older ones are overwritten once the ring is full
+EVENT_CAPACITY = 1 << 16
+EVENT_DTYPE = np.dtype([
+    ("tick", "<u4"), ("type", "u1"), ("car", "u1"), ("waypoint", "<u2"), ("value", "<f4"),
+])
+
+
+class EventBus:
+    """Typed race events, recorded in a ring buffer and passed to subscribers.
+
+    emit() only queues a tuple, so it is cheap enough to leave on. flush()
+    copies the queue into ring, a structured array of (tick, type, car,
+    waypoint, value) rows where type indexes types, then hands each event
+    to the subscribers of its type as fn(tick, kind, car, waypoint, value).
+    """
+
+    def __init__(self, types, capacity=EVENT_CAPACITY):
+        self.types = tuple(types)
+        self.ring = np.zeros(capacity, EVENT_DTYPE)
+        self.count = 0
+        self._code = {kind: i for i, kind in enumerate(self.types)}
+        self._subscribers = {kind: [] for kind in self.types}
+        self._pending = []
+
+    def subscribe(self, kinds, fn):
+        for kind in (kinds,) if isinstance(kinds, str) else kinds:
+            self._subscribers[kind].append(fn)
+
+    def emit(self, tick, kind, car, waypoint=0, value=0.0):
+        self._pending.append((tick, kind, car, waypoint, value))
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        ring, code, cap = self.ring, self._code, len(self.ring)
+        for tick, kind, car, waypoint, value in pending:
+            ring[self.count % cap] = (tick, code[kind], car, waypoint, value)
+            self.count += 1
+        subscribers = self._subscribers
+        for event in pending:
+            for fn in subscribers[event[1]]:
+                fn(*event)
+
+    def recent(self):
+        """The recorded events, oldest first."""
+        cap = len(self.ring)
+        if self.count <= cap:
+            return self.ring[:self.count]
+        return np.roll(self.ring, -(self.count % cap))
+
+    def export_npz(self, path, **meta):
+        """Save the recorded events, the type names and any extra arrays."""
+        np.savez_compressed(path, events=self.recent(), types=np.array(self.types),
+                            dropped=max(self.count - len(self.ring), 0), **meta)
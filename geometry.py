@@ -0,0 +1,280 @@
+import math
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+from spatial import TrackIndex
+
+LANE_WIDTH = 40
+TRACK_WIDTH = LANE_WIDTH * 3 + 20
+NUM_WAYPOINTS = 600
+# Chord error in pixels of the built-in tracks' adaptive waypoints, and the
+# default for track files
+ADAPTIVE_CHORD_ERROR = 0.25
+# Timing sectors per lap on tracks that don't set their own
+TIMING_SECTORS = 3
+
+TRACKS = {
+    "Monaco": {
+        "controls": [
+            (960, 860), (1200, 870), (1400, 830), (1550, 720),
+            (1620, 550), (1600, 380), (1500, 250), (1350, 180),
+            (1200, 170), (1100, 230), (1080, 340), (1150, 430),
+            (1100, 520), (950, 500), (780, 470), (620, 490),
+            (480, 550), (400, 660), (380, 780), (430, 870),
+            (600, 890), (780, 875),
+        ],
+        "color": (255, 200, 50),
+        "bg": (26, 26, 46),
+        "tarmac": (55, 55, 65),
+        "max_chord_error": ADAPTIVE_CHORD_ERROR,
+    },
+    "Monza": {
+        "controls": [
+            (400, 800), (700, 820), (1050, 830), (1400, 810),
+            (1600, 750), (1680, 620), (1620, 500), (1450, 480),
+            (1350, 520), (1250, 480), (1150, 440), (1050, 480),
+            (900, 460), (700, 430), (500, 400), (350, 350),
+            (280, 280), (320, 200), (450, 180), (650, 200),
+            (850, 240), (1050, 260), (1250, 240), (1400, 200),
+            (1500, 250), (1480, 350), (1350, 380), (1100, 360),
+            (800, 340), (550, 360), (350, 440), (300, 560),
+            (310, 680), (350, 770),
+        ],
+        "color": (50, 200, 50),
+        "bg": (20, 35, 20),
+        "tarmac": (50, 55, 50),
+        "max_chord_error": ADAPTIVE_CHORD_ERROR,
+    },
+    "Spa": {
+        "controls": [
+            (500, 850), (750, 860), (1000, 840), (1200, 780),
+            (1350, 680), (1400, 550), (1380, 420), (1450, 300),
+            (1550, 220), (1650, 180), (1700, 250), (1680, 380),
+            (1600, 480), (1500, 550), (1400, 640), (1250, 700),
+            (1100, 680), (1000, 600), (900, 500), (800, 380),
+            (700, 300), (580, 260), (450, 280), (350, 340),
+            (300, 440), (320, 560), (380, 680), (430, 780),
+        ],
+        "color": (255, 100, 100),
+        "bg": (30, 26, 20),
+        "tarmac": (60, 55, 50),
+        "max_chord_error": ADAPTIVE_CHORD_ERROR,
+    },
+    "Silverstone": {
+        "controls": [
+            (700, 850), (950, 870), (1200, 850), (1400, 790),
+            (1550, 700), (1620, 570), (1600, 440), (1500, 340),
+            (1380, 280), (1250, 250), (1100, 260), (980, 310),
+            (880, 380), (800, 320), (700, 250), (580, 220),
+            (450, 240), (350, 310), (310, 420), (340, 540),
+            (400, 630), (350, 720), (320, 800), (400, 860),
+            (550, 870),
+        ],
+        "color": (100, 150, 255),
+        "bg": (20, 25, 35),
+        "tarmac": (50, 52, 60),
+        "max_chord_error": ADAPTIVE_CHORD_ERROR,
+    },
+    "Suzuka": {
+        "controls": [
+            (960, 880), (1200, 870), (1400, 820), (1530, 720),
+            (1580, 580), (1550, 440), (1450, 340), (1300, 280),
+            (1150, 260), (1050, 300), (980, 380), (920, 460),
+            (840, 400), (760, 320), (660, 260), (540, 230),
+            (420, 260), (340, 340), (310, 450), (340, 570),
+            (420, 660), (530, 720), (650, 750), (780, 770),
+            (880, 810), (900, 860),
+        ],
+        "color": (255, 150, 200),
+        "bg": (30, 20, 28),
+        "tarmac": (58, 50, 55),
+        "max_chord_error": ADAPTIVE_CHORD_ERROR,
+    },
+}
+
+TRACK_NAMES = list(TRACKS.keys())
+
+
+class TrackGeometry:
+    """Waypoints, lanes and distance tables of a circuit, without pygame.
+
+    Track adds drawing on top; the simulation only ever needs this part.
+    """
+
+    def __init__(self, name=None, control_points=None, max_chord_error=None, config=None):
+        """Build a track from TRACKS, a config dict or bare control points.
+
+        A config holds "controls", "color", "bg" and "tarmac", and may add
+        "name", "max_chord_error", a precomputed "centerline" of
+        waypoints that skips smoothing and resampling, and "sectors", the
+        fractions of the lap at which timing sectors after the first begin.
+        A max_chord_error argument overrides the config's; without either,
+        the centerline gets NUM_WAYPOINTS evenly spaced waypoints.
+        """
+        cfg = config or TRACKS.get(name)
+        if cfg is not None:
+            controls = cfg["controls"]
+            self.color = tuple(cfg["color"])
+            self.bg_color = tuple(cfg["bg"])
+            self.tarmac_color = tuple(cfg["tarmac"])
+            self.name = cfg.get("name", name)
+            if max_chord_error is None:
+                max_chord_error = cfg.get("max_chord_error")
+        else:
+            controls = control_points or TRACKS["Monaco"]["controls"]
+            self.color = (255, 200, 50)
+            self.bg_color = (26, 26, 46)
+            self.tarmac_color = (55, 55, 65)
+            self.name = name or "Monaco"
+        self.controls = np.asarray(controls, dtype=np.float64)
+        self.max_chord_error = max_chord_error
+        if cfg is not None and cfg.get("centerline") is not None:
+            self.centerline_xy = np.asarray(cfg["centerline"], dtype=np.float64)
+        elif max_chord_error is None:
+            self.centerline_xy = _evenly_space(_chaikin(self.controls, iterations=5), NUM_WAYPOINTS)
+        else:
+            self.centerline_xy = _adaptive_space(_chaikin(self.controls, iterations=5), max_chord_error)
+        self.normals_xy = _compute_normals(self.centerline_xy)
+        self.lanes_xy = np.stack([
+            _offset_lane(self.centerline_xy, self.normals_xy, -LANE_WIDTH),
+            self.centerline_xy,
+            _offset_lane(self.centerline_xy, self.normals_xy, LANE_WIDTH),
+        ])
+        # Tuple views for per-waypoint lookups from the simulation and the HUD
+        self.centerline = _as_tuples(self.centerline_xy)
+        self.normals = _as_tuples(self.normals_xy)
+        self.lanes = [_as_tuples(lane) for lane in self.lanes_xy]
+        # Arc length at each waypoint per lane; the extra last entry is the
+        # lap length, so segment i spans [d[i], d[i + 1])
+        seg = np.roll(self.lanes_xy, -1, axis=1) - self.lanes_xy
+        seg_len = np.hypot(seg[..., 0], seg[..., 1])
+        self.lane_arc_length = np.concatenate((np.zeros((3, 1)), np.cumsum(seg_len, axis=1)), axis=1)
+        self.lane_distances = [row.tolist() for row in self.lane_arc_length]
+        self.distances = self.lane_arc_length[1]
+        self.length = float(self.distances[-1])
+        self.num_waypoints = len(self.centerline)
+        self.start_index = 0
+        sectors = cfg.get("sectors") if cfg is not None else None
+        if sectors is None:
+            sectors = [i / TIMING_SECTORS for i in range(1, TIMING_SECTORS)]
+        self.sectors = tuple(float(f) for f in sectors)
+        if any(not 0 < f < 1 for f in self.sectors) or list(self.sectors) != sorted(set(self.sectors)):
+            raise ValueError(f"Sector starts must rise strictly within (0, 1), got {self.sectors}")
+        # Where each sector ends in waypoint progress; the last ends on the line
+        self.sector_ends = np.append(
+            np.interp(np.array(self.sectors) * self.length, self.distances, np.arange(self.num_waypoints + 1)),
+            self.num_waypoints)
+        self._index = None
+
+    def index_at(self, fraction):
+        """Waypoint nearest to a fraction of the lap along the centerline."""
+        target = (fraction % 1.0) * self.length
+        d = self.lane_distances[1]
+        i = bisect_left(d, target)
+        if i > 0 and target - d[i - 1] < d[i] - target:
+            i -= 1
+        return i % self.num_waypoints
+
+    def point_at(self, lane, distance):
+        """Interpolated (x, y) at a distance along a lane, wrapping laps."""
+        d = self.lane_distances[lane]
+        distance %= d[-1]
+        # A binary search on purpose: a bucket table makes this O(1), but at
+        # a few hundred waypoints its Python-level walk is slower than bisect
+        i = bisect_right(d, distance) - 1
+        seg = d[i + 1] - d[i]
+        frac = (distance - d[i]) / seg if seg > 0 else 0.0
+        (x0, y0), (x1, y1) = self.lanes[lane][i], self.lanes[lane][(i + 1) % self.num_waypoints]
+        return x0 + (x1 - x0) * frac, y0 + (y1 - y0) * frac
+
+    def locate(self, x, y):
+        """Nearest waypoint, lane, signed lateral offset and arc length of a point."""
+        return self.spatial_index().locate(x, y)
+
+    def locate_many(self, points):
+        """Batched locate() over an (M, 2) array; returns four arrays."""
+        return self.spatial_index().query(points)
+
+    def spatial_index(self):
+        if self._index is None:
+            self._index = TrackIndex(self.centerline_xy, self.normals_xy, self.distances, LANE_WIDTH)
+        return self._index
+
+    def _resample(self, n):
+        """Centerline points and unit normals at n evenly spaced distances."""
+        targets = np.arange(n) * (self.length / n)
+        out = []
+        for arr in (self.centerline_xy, self.normals_xy):
+            closed = np.vstack([arr, arr[:1]])
+            out.append(np.column_stack((
+                np.interp(targets, self.distances, closed[:, 0]),
+                np.interp(targets, self.distances, closed[:, 1]),
+            )))
+        c, n = out
+        n /= np.hypot(n[:, 0], n[:, 1])[:, None]
+        return c, n
+
+
+def _chaikin(points, iterations):
+    pts = np.asarray(points, dtype=np.float64)
+    for _ in range(iterations):
+        nxt = np.roll(pts, -1, axis=0)
+        new = np.empty((len(pts) * 2, 2))
+        new[0::2] = 0.75 * pts + 0.25 * nxt
+        new[1::2] = 0.25 * pts + 0.75 * nxt
+        pts = new
+    return pts
+
+
+def _evenly_space(points, n):
+    """Resample a closed polyline to n points spaced evenly by arc length."""
+    closed = np.vstack([points, points[:1]])
+    seg = np.hypot(*np.diff(closed, axis=0).T)
+    dists = np.concatenate(([0.0], np.cumsum(seg)))
+    targets = np.arange(n) * (dists[-1] / n)
+    return np.column_stack((
+        np.interp(targets, dists, closed[:, 0]),
+        np.interp(targets, dists, closed[:, 1]),
+    ))
+
+
+def _adaptive_space(points, max_error, min_spacing=1.0, max_spacing=40.0):
+    """Resample a closed polyline with spacing driven by its curvature.
+
+    A chord of length h across an arc of radius R sags by about h*h / (8 R),
+    so each stretch is sampled every sqrt(8 R max_error) pixels, clamped
+    to [min_spacing, max_spacing].
+    """
+    closed = np.vstack([points, points[:1]])
+    d = np.diff(closed, axis=0)
+    seg = np.hypot(d[:, 0], d[:, 1])
+    heading = np.arctan2(d[:, 1], d[:, 0])
+    turn = np.abs((heading - np.roll(heading, 1) + math.pi) % (2 * math.pi) - math.pi)
+    curvature = turn / np.maximum((seg + np.roll(seg, 1)) / 2, 1e-9)
+    # Widen peaks a little so spacing tightens before a corner, not in it
+    curvature = np.maximum.reduce([np.roll(curvature, k) for k in range(-2, 3)])
+    seg_curvature = np.maximum(curvature, np.roll(curvature, -1))
+    spacing = np.clip(np.sqrt(8 * max_error / np.maximum(seg_curvature, 1e-9)), min_spacing, max_spacing)
+    dists = np.concatenate(([0.0], np.cumsum(seg)))
+    budget = np.concatenate(([0.0], np.cumsum(seg / spacing)))
+    count = max(int(np.ceil(budget[-1])), 16)
+    targets = np.interp(np.arange(count) * (budget[-1] / count), budget, dists)
+    return np.column_stack((
+        np.interp(targets, dists, closed[:, 0]),
+        np.interp(targets, dists, closed[:, 1]),
+    ))
+
+
+def _compute_normals(centerline):
+    d = np.roll(centerline, -1, axis=0) - centerline
+    length = np.hypot(d[:, 0], d[:, 1])
+    length[length == 0] = 1
+    return np.column_stack((-d[:, 1] / length, d[:, 0] / length))
+
+
+def _offset_lane(centerline, normals, offset):
+    return centerline + normals * offset
+
+
+def _as_tuples(arr):
+    return list(map(tuple, arr.tolist()))
@@ -1,6 +1,62 @@
+import math
+from collections import OrderedDict
+
 import pygame
 from car import PLAYER_COLORS
 from controls import PLAYER_KEYS
+from profiler import surface_made
+
+# Rendered strings kept by TextCache, least recently used dropped first
+TEXT_CACHE_SIZE = 256
+
+
+class TextCache:
+    """Rendered text surfaces keyed by (font, text, color, antialias).
+
+    One cache is shared by every HUD screen, so a label is only rendered
+    again after it changes. hits and misses count lookups.
+    """
+
+    def __init__(self, limit=TEXT_CACHE_SIZE):
+        self.limit = limit
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+        self._cells = {}
+
+    def render(self, font, text, color, antialias=True):
+        """font.render(text, antialias, color), cached; don't draw on it."""
+        key = (font, text, color, antialias)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surf
+        self.misses += 1
+        surface_made()
+        surf = self._surfaces[key] = font.render(text, antialias, color)
+        if len(self._surfaces) > self.limit:
+            self._surfaces.popitem(last=False)
+        return surf
+
+    def blit_number(self, surface, font, text, color, topright):
+        """Blit a string of digits and punctuation glyph by glyph.
+
+        For numbers that change every frame, such as clocks: only the few
+        glyphs are ever rendered. Digits get equal-width cells so the text
+        doesn't jitter as it counts. Returns the rect covered.
+        """
+        cell = self._cells.get(font)
+        if cell is None:
+            cell = self._cells[font] = max(font.size(d)[0] for d in "0123456789")
+        glyphs = [self.render(font, ch, color) for ch in text]
+        widths = [cell if ch.isdigit() else g.get_width() for ch, g in zip(text, glyphs)]
+        x, y = topright[0] - sum(widths), topright[1]
+        rect = pygame.Rect(x, y, sum(widths), font.get_height())
+        for g, w in zip(glyphs, widths):
+            surface.blit(g, (x + (w - g.get_width()) // 2, y))
+            x += w
+        return rect
 
 
 class HUD:
@@ -9,6 +65,10 @@ class HUD:
         self.font_md = None
         self.font_sm = None
         self.font_xs = None
+        self.text = TextCache()
+        self._cards = OrderedDict()
+        self._layers = {}
+
     def _init(self):
         if self.font_lg is None:
             self.font_lg = pygame.font.Font(None, 96)
@@ -16,34 +76,51 @@ class HUD:
             self.font_sm = pygame.font.Font(None, 32)
             self.font_xs = pygame.font.Font(None, 24)
 
-    def render_race(self, surface, race):
+    def _layer(self, name, key, build):
+        """Surface from build(), reused until key (sizes, counts...) changes."""
+        cached = self._layers.get(name)
+        if cached is None or cached[0] != key:
+            cached = self._layers[name] = (key, build())
+        return cached[1]
+
+    def render_race(self, surface, race, poses=None):
+        """Draw the race HUD; returns the rects it covers.
+
+        poses, one (x, y, angle) per car as drawn this frame, places the
+        position badges; without them the cars' tick positions are used.
+        """
         self._init()
-        positions = race.get_positions()
         num = len(race.cars)
         spacing = min(420, (surface.get_width() - 200) // max(num, 1))
         # Top HUD panel
-        panel = pygame.Surface((spacing * num + 60, 80), pygame.SRCALPHA)
-        panel.fill((0, 0, 0, 120))
-        surface.blit(panel, (70, 5))
-        for car in race.cars:
+        panel = self._layer("race_panel", (spacing, num), lambda: _panel((spacing * num + 60, 80), 120))
+        drawn = [surface.blit(panel, (70, 5))]
+        timing = race.timing
+        for i, car in enumerate(race.cars):
             color = PLAYER_COLORS[car.player_id % 4]
-            pos_num = positions.index(car) + 1
+            pos_num = race.position(car)
             # Position badge near car
-            badge = pygame.Surface((28, 22), pygame.SRCALPHA)
-            badge.fill((*color, 180))
-            lbl = self.font_xs.render(f"P{pos_num}", True, (255, 255, 255))
-            badge.blit(lbl, lbl.get_rect(center=(14, 11)))
-            surface.blit(badge, (int(car.pos[0]) + 24, int(car.pos[1]) - 22))
+            badge = self._layer(("badge", car.player_id), (pos_num, color),
+                                lambda: self._badge(color, pos_num))
+            x, y = poses[i][:2] if poses is not None else car.pos
+            drawn.append(surface.blit(badge, (int(x) + 24, int(y) - 22)))
             # Top HUD
             hx = 90 + car.player_id * spacing
             # Player name + position
             pos_color = (255, 215, 0) if pos_num == 1 else color
-            txt = self.font_sm.render(f"P{car.player_id+1}", True, pos_color)
+            txt = self.text.render(self.font_sm, f"P{car.player_id+1}", pos_color)
             surface.blit(txt, (hx, 12))
             # Lap counter
             lap_display = min(car.lap + 1, 5)
-            lap_txt = self.font_xs.render(f"Lap {lap_display}/5", True, (200, 200, 200))
+            lap_txt = self.text.render(self.font_xs, f"Lap {lap_display}/5", (200, 200, 200))
             surface.blit(lap_txt, (hx + 40, 16))
+            # Gap to the leader at the last timing line, then lap times
+            gap = timing.gap[i]
+            if gap > 0:
+                surface.blit(self.text.render(self.font_xs, f"+{gap:.2f}", (255, 200, 120)), (hx + 115, 16))
+            for row, (label, t) in enumerate((("Last", timing.last_lap[i]), ("Best", timing.best_lap[i]))):
+                txt = self.text.render(self.font_xs, f"{label} {_lap_time(t)}", (170, 170, 180))
+                surface.blit(txt, (hx + 80, 40 + 16 * row))
             # Boost charges as filled/empty circles
             for b in range(3):
                 bx = hx + b * 22
@@ -58,26 +135,41 @@ class HUD:
                 bar_w = int(70 * car.boost_timer / 2.5)
                 pygame.draw.rect(surface, (255, 180, 30), (hx, 66, bar_w, 4), border_radius=2)
                 pygame.draw.rect(surface, (255, 220, 100), (hx, 66, max(1, bar_w - 2), 2), border_radius=1)
+        # Race clock
+        t = race.race_time
+        drawn.append(self.text.blit_number(surface, self.font_sm, f"{int(t // 60)}:{t % 60:04.1f}",
+                                           (230, 230, 230), (surface.get_width() - 30, 15)))
+        return drawn
+
+    def _badge(self, color, pos_num):
+        badge = _panel((28, 22), 180, color)
+        lbl = self.text.render(self.font_xs, f"P{pos_num}", (255, 255, 255))
+        badge.blit(lbl, lbl.get_rect(center=(14, 11)))
+        return badge
 
     def render_countdown(self, surface, value):
         self._init()
         text = str(value) if value > 0 else "GO!"
         color = (255, 80, 80) if value > 0 else (80, 255, 80)
-        surf = self.font_lg.render(text, True, color)
+        surf = self.text.render(self.font_lg, text, color)
         rect = surf.get_rect(center=(surface.get_width() // 2, surface.get_height() // 2))
-        shadow = self.font_lg.render(text, True, (0, 0, 0))
+        shadow = self.text.render(self.font_lg, text, (0, 0, 0))
         surface.blit(shadow, (rect.x + 3, rect.y + 3))
         surface.blit(surf, rect)
 
     def render_finish(self, surface, race):
         self._init()
-        overlay = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 160))
-        surface.blit(overlay, (0, 0))
+        # Nothing on the results screen changes once it is up, so it is all
+        # drawn onto one translucent layer
+        key = (surface.get_size(), tuple(race.finished_order[:3]))
+        surface.blit(self._layer("finish", key, lambda: self._finish_layer(surface.get_size(), race)), (0, 0))
+
+    def _finish_layer(self, size, race):
+        surface = _panel(size, 160)
         winner = race.get_winner()
         if winner:
             color = PLAYER_COLORS[winner.player_id % 4]
-            txt = self.font_lg.render(f"Player {winner.player_id+1} Wins!", True, color)
+            txt = self.text.render(self.font_lg, f"Player {winner.player_id+1} Wins!", color)
             rect = txt.get_rect(center=(surface.get_width() // 2, 180))
             surface.blit(txt, rect)
         cx = surface.get_width() // 2
@@ -91,48 +183,69 @@ class HUD:
             color = PLAYER_COLORS[car.player_id % 4]
             pygame.draw.rect(surface, color, (px - 50, py + 96 - ph, 100, ph))
             sprite = pygame.transform.scale(car.sprite, (80, 80))
+            surface_made()
             surface.blit(sprite, (px - 40, py))
-            pos_txt = self.font_md.render(f"#{i+1}", True, (255, 255, 255))
+            pos_txt = self.text.render(self.font_md, f"#{i+1}", (255, 255, 255))
             surface.blit(pos_txt, pos_txt.get_rect(center=(px, py + 96 + 20)))
-        prompt = self.font_md.render("Press SPACE to race again", True, (200, 200, 200))
+        prompt = self.text.render(self.font_md, "Press SPACE to race again", (200, 200, 200))
         surface.blit(prompt, prompt.get_rect(center=(cx, surface.get_height() - 80)))
+        return surface
 
     def render_track_select(self, surface, tracks, selected_idx):
         self._init()
         cx = surface.get_width() // 2
-        title = self.font_lg.render("SELECT TRACK", True, (255, 255, 255))
+        title = self.text.render(self.font_lg, "SELECT TRACK", (255, 255, 255))
         surface.blit(title, title.get_rect(center=(cx, 80)))
-        total = len(tracks)
+        # Show a window of cards around the selection so any number of
+        # installed tracks fits and only visible thumbnails get built
+        visible = min(len(tracks), 5)
+        first = max(0, min(selected_idx - visible // 2, len(tracks) - visible))
         card_w, card_h = 300, 200
         gap = 30
-        total_w = total * card_w + (total - 1) * gap
+        total_w = visible * card_w + (visible - 1) * gap
         start_x = cx - total_w // 2
-        for i, track in enumerate(tracks):
-            x = start_x + i * (card_w + gap)
+        for slot in range(visible):
+            i = first + slot
+            track = tracks[i]
+            x = start_x + slot * (card_w + gap)
             y = 200
             is_sel = i == selected_idx
-            border_color = track.color if is_sel else (80, 80, 80)
-            pygame.draw.rect(surface, (30, 30, 40), (x, y, card_w, card_h), border_radius=8)
-            pygame.draw.rect(surface, border_color, (x, y, card_w, card_h), 3, border_radius=8)
-            mini = track.render_mini((card_w - 20, card_h - 50))
-            surface.blit(mini, (x + 10, y + 10))
-            name_surf = self.font_sm.render(track.name, True, track.color if is_sel else (150, 150, 150))
-            surface.blit(name_surf, name_surf.get_rect(center=(x + card_w // 2, y + card_h - 15)))
+            surface.blit(self._track_card(track, is_sel, card_w, card_h), (x, y))
             if is_sel:
-                arrow = self.font_md.render("^", True, track.color)
+                arrow = self.text.render(self.font_md, "^", track.color)
                 surface.blit(arrow, arrow.get_rect(center=(x + card_w // 2, y + card_h + 25)))
         keys_text = "LEFT/RIGHT to browse  |  SPACE to race"
-        prompt = self.font_md.render(keys_text, True, (200, 200, 200))
+        prompt = self.text.render(self.font_md, keys_text, (200, 200, 200))
         surface.blit(prompt, prompt.get_rect(center=(cx, surface.get_height() - 80)))
 
+    def _track_card(self, track, is_sel, card_w, card_h, limit=32):
+        """Composed track-select card, cached per track and highlight state."""
+        key = (track, track.color, is_sel, card_w, card_h)
+        card = self._cards.get(key)
+        if card is not None:
+            self._cards.move_to_end(key)
+            return card
+        card = pygame.Surface((card_w, card_h), pygame.SRCALPHA)
+        surface_made()
+        border_color = track.color if is_sel else (80, 80, 80)
+        pygame.draw.rect(card, (30, 30, 40), (0, 0, card_w, card_h), border_radius=8)
+        pygame.draw.rect(card, border_color, (0, 0, card_w, card_h), 3, border_radius=8)
+        card.blit(track.render_mini((card_w - 20, card_h - 50)), (10, 10))
+        name_surf = self.text.render(self.font_sm, track.name, track.color if is_sel else (150, 150, 150))
+        card.blit(name_surf, name_surf.get_rect(center=(card_w // 2, card_h - 15)))
+        self._cards[key] = card
+        if len(self._cards) > limit:
+            self._cards.popitem(last=False)
+        return card
+
     def render_player_select(self, surface, num_players):
         self._init()
         cx, cy = surface.get_width() // 2, surface.get_height() // 2
         # Game title
-        title = self.font_lg.render("WALL RACERS", True, (255, 200, 50))
+        title = self.text.render(self.font_lg, "WALL RACERS", (255, 200, 50))
         surface.blit(title, title.get_rect(center=(cx, cy - 280)))
         # Question
-        question = self.font_md.render("How many players?", True, (200, 200, 200))
+        question = self.text.render(self.font_md, "How many players?", (200, 200, 200))
         surface.blit(question, question.get_rect(center=(cx, cy - 160)))
         # Draw 1-4 as big selectable numbers
         for i in range(1, 5):
@@ -147,9 +260,9 @@ class HUD:
             else:
                 pygame.draw.circle(surface, color, (int(x), int(y)), radius, 3)
                 txt_color = color
-            num = self.font_lg.render(str(i), True, txt_color)
+            num = self.text.render(self.font_lg, str(i), txt_color)
             surface.blit(num, num.get_rect(center=(int(x), int(y))))
-            lbl = self.font_sm.render(f"{'player' if i == 1 else 'players'}", True, color)
+            lbl = self.text.render(self.font_sm, f"{'player' if i == 1 else 'players'}", color)
             surface.blit(lbl, lbl.get_rect(center=(int(x), int(y) + 90)))
         # Controls preview for selected count
         key_names = {
@@ -165,31 +278,30 @@ class HUD:
             ln = key_names.get(keys["lane"], "?")
             bs = key_names.get(keys["boost"], "?")
             hk = key_names.get(keys["honk"], "?")
-            txt = self.font_xs.render(f"P{i+1}: {ln} = Lane   {bs} = Boost   {hk} = Honk", True, color)
+            txt = self.text.render(self.font_xs, f"P{i+1}: {ln} = Lane   {bs} = Boost   {hk} = Honk", color)
             surface.blit(txt, txt.get_rect(center=(cx, controls_y + i * 28)))
-        prompt = self.font_md.render("LEFT/RIGHT to choose  |  SPACE to start", True, (255, 255, 255))
+        prompt = self.text.render(self.font_md, "LEFT/RIGHT to choose  |  SPACE to start", (255, 255, 255))
         surface.blit(prompt, prompt.get_rect(center=(cx, surface.get_height() - 80)))
 
     def render_processing(self, surface, player_id, snapshot_surf=None):
         self._init()
         cx = surface.get_width() // 2
         color = PLAYER_COLORS[player_id % 4]
-        txt = self.font_lg.render(f"Player {player_id+1}", True, color)
+        txt = self.text.render(self.font_lg, f"Player {player_id+1}", color)
         surface.blit(txt, txt.get_rect(center=(cx, 80)))
         # Show frozen snapshot with a "captured" overlay
         if snapshot_surf:
             rect = snapshot_surf.get_rect(center=(cx, surface.get_height() // 2 - 20))
             surface.blit(snapshot_surf, rect)
             # Dim overlay
-            dim = pygame.Surface(snapshot_surf.get_size(), pygame.SRCALPHA)
-            dim.fill((0, 0, 0, 80))
-            surface.blit(dim, rect)
+            surface.blit(self._layer("dim", snapshot_surf.get_size(),
+                                     lambda: _panel(snapshot_surf.get_size(), 80)), rect)
             pygame.draw.rect(surface, color, rect, 3)
         # Spinning dots animation
         import time
         t = time.time()
         dots = "." * (int(t * 3) % 4)
-        msg = self.font_md.render(f"Cutting out car{dots}", True, (255, 255, 255))
+        msg = self.text.render(self.font_md, f"Cutting out car{dots}", (255, 255, 255))
         surface.blit(msg, msg.get_rect(center=(cx, surface.get_height() - 120)))
         # Spinner
         import math
@@ -206,9 +318,9 @@ class HUD:
     def render_lobby(self, surface, num_players, car_sprites):
         self._init()
         cx, cy = surface.get_width() // 2, surface.get_height() // 2
-        title = self.font_lg.render("WALL RACERS", True, (255, 200, 50))
+        title = self.text.render(self.font_lg, "WALL RACERS", (255, 200, 50))
         surface.blit(title, title.get_rect(center=(cx, 180)))
-        subtitle = self.font_md.render("Place your car on the mat", True, (180, 180, 180))
+        subtitle = self.text.render(self.font_md, "Place your car on the mat", (180, 180, 180))
         surface.blit(subtitle, subtitle.get_rect(center=(cx, 260)))
         for i in range(num_players):
             x = cx + (i - num_players / 2 + 0.5) * 220
@@ -217,11 +329,12 @@ class HUD:
             pygame.draw.rect(surface, color, (int(x) - 50, int(y) - 50, 100, 100), 3)
             if i in car_sprites:
                 spr = pygame.transform.scale(car_sprites[i], (80, 80))
+                surface_made()
                 surface.blit(spr, (int(x) - 40, int(y) - 40))
             else:
-                txt = self.font_md.render("?", True, color)
+                txt = self.text.render(self.font_md, "?", color)
                 surface.blit(txt, txt.get_rect(center=(int(x), int(y))))
-            lbl = self.font_sm.render(f"Player {i+1}", True, color)
+            lbl = self.text.render(self.font_sm, f"Player {i+1}", color)
             surface.blit(lbl, lbl.get_rect(center=(int(x), int(y) + 70)))
         # Controls reference
         key_names = {
@@ -237,25 +350,40 @@ class HUD:
             ln = key_names.get(keys["lane"], "?")
             bs = key_names.get(keys["boost"], "?")
             hk = key_names.get(keys["honk"], "?")
-            txt = self.font_xs.render(f"P{i+1}: {ln}=Lane  {bs}=Boost  {hk}=Honk", True, color)
+            txt = self.text.render(self.font_xs, f"P{i+1}: {ln}=Lane  {bs}=Boost  {hk}=Honk", color)
             surface.blit(txt, txt.get_rect(center=(cx, cy_controls + i * 28)))
-        prompt = self.font_md.render("Press SPACE to start scanning", True, (255, 255, 255))
+        prompt = self.text.render(self.font_md, "Press SPACE to start scanning", (255, 255, 255))
         surface.blit(prompt, prompt.get_rect(center=(cx, surface.get_height() - 80)))
 
     def render_scanning(self, surface, player_id, preview_surf=None):
         self._init()
         cx = surface.get_width() // 2
         color = PLAYER_COLORS[player_id % 4]
-        txt = self.font_lg.render(f"Scan Player {player_id+1}'s Car", True, color)
+        txt = self.text.render(self.font_lg, f"Scan Player {player_id+1}'s Car", color)
         surface.blit(txt, txt.get_rect(center=(cx, 100)))
         if preview_surf:
             rect = preview_surf.get_rect(center=(cx, surface.get_height() // 2))
             surface.blit(preview_surf, rect)
             pygame.draw.rect(surface, color, rect, 3)
         else:
-            msg = self.font_md.render("No webcam — using default car", True, (200, 150, 50))
+            msg = self.text.render(self.font_md, "No webcam — using default car", (200, 150, 50))
             surface.blit(msg, msg.get_rect(center=(cx, surface.get_height() // 2)))
-        hint = self.font_sm.render("Point nose DOWN  |  Hold car in the yellow box", True, (160, 160, 160))
+        hint = self.text.render(self.font_sm, "Point nose DOWN  |  Hold car in the yellow box", (160, 160, 160))
         surface.blit(hint, hint.get_rect(center=(cx, surface.get_height() - 130)))
-        prompt = self.font_md.render("Press SPACE to capture", True, (200, 200, 200))
+        prompt = self.text.render(self.font_md, "Press SPACE to capture", (200, 200, 200))
         surface.blit(prompt, prompt.get_rect(center=(cx, surface.get_height() - 80)))
+
+
+def _lap_time(t):
+    """m:ss.ss, or dashes for a time not set yet."""
+    if math.isnan(t):
+        return "-:--.--"
+    return f"{int(t // 60)}:{t % 60:05.2f}"
+
+
+def _panel(size, alpha, color=(0, 0, 0)):
+    """Translucent filled surface."""
+    panel = pygame.Surface(size, pygame.SRCALPHA)
+    surface_made()
+    panel.fill((*color, alpha))
+    return panel
@@ -1,17 +1,23 @@
 import os
+import random
 import pygame
 import sys
+import time
 from enum import Enum
 
-from controls import PLAYER_KEYS, SCAN_KEY, WIDTH, HEIGHT, FPS
-from track import Track, TRACK_NAMES
+from controls import PLAYER_KEYS, SCAN_KEY, PROFILE_KEY, WIDTH, HEIGHT, FPS, DIRTY_RECTS
+from registry import TrackRegistry
 from car import Car, PLAYER_COLORS
 from scanner import Scanner
-from items import create_track_items
-from race import RaceManager
+from items import Item
+from profiler import PROFILE_DIR, FrameProfiler
+from replay import REPLAY_DIR, REPLAY_EXT, Replay, save_replay
+from sim import ACTIONS, StepClock, TICK, new_race
 from hud import HUD
 from sounds import SoundManager
-from effects import ParticleSystem
+from dirty import DirtyRects
+from effects import GlowLayer, ParticleSystem
+from events import TELEMETRY_DIR
 
 
 class State(Enum):
@@ -31,15 +37,22 @@ class Game:
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
         pygame.display.set_caption("Wall Racers")
         self.clock = pygame.time.Clock()
+        self.step_clock = StepClock()
         self.sfx = SoundManager()
         self.sfx.init()
         self.state = State.PLAYER_SELECT
         self.hud = HUD()
         self.scanner = Scanner()
         self.particles = ParticleSystem()
+        self.glow = GlowLayer(self.screen.get_size())
+        self.dirty = DirtyRects(self.screen.get_size()) if DIRTY_RECTS else None
+        self.profiler = FrameProfiler()
+        self.honk_font = pygame.font.Font(None, 28)
         self.cars = []
         self.items = []
         self.race = None
+        self.sim = None
+        self.replay = None
         self.track = None
         self.car_sprites = {}
         self.scan_player = 0
@@ -47,14 +60,15 @@ class Game:
         self.countdown_value = 3
         self.preview_surf = None
         self.num_players = 2
-        self.all_tracks = [Track(name) for name in TRACK_NAMES]
+        self.all_tracks = TrackRegistry()
         self.selected_track_idx = 0
         self.honk_timers = {}
+        self.boost_ticks = 0
         self.finish_fireworks_timer = 0.0
 
     def run(self):
         while True:
-            dt = self.clock.tick(FPS) / 1000.0
+            frame_time = self.clock.tick(FPS) / 1000.0
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self._quit()
@@ -62,9 +76,12 @@ class Game:
                     if event.key == pygame.K_ESCAPE:
                         self._quit()
                     self._handle_key(event.key)
-            self._update(dt)
-            self._render()
-            pygame.display.flip()
+            self.profiler.frame(len(self.particles))
+            # The game always advances in whole TICKs, however long the
+            # frame took; rendering blends between the last two ticks
+            for _ in range(self.step_clock.advance(frame_time)):
+                self._update(TICK)
+            self._present(self._render(self.step_clock.alpha))
 
     def _screenshot(self):
         shots_dir = os.path.join(os.path.dirname(__file__), "screenshots")
@@ -75,6 +92,10 @@ class Game:
         pygame.image.save(self.screen, path)
 
     def _quit(self):
+        if self.profiler.count:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            self.profiler.export_csv(os.path.join(PROFILE_DIR, f"frames_{stamp}.csv"))
         self.scanner.close()
         pygame.quit()
         sys.exit()
@@ -83,6 +104,9 @@ class Game:
         if key == pygame.K_BACKQUOTE:
             self._screenshot()
             return
+        if key == PROFILE_KEY:
+            self.profiler.toggle()
+            return
         if self.state == State.PLAYER_SELECT:
             if key in (pygame.K_LEFT, pygame.K_a):
                 self.num_players = max(1, self.num_players - 1)
@@ -110,36 +134,54 @@ class Game:
 
         elif self.state == State.RACING:
             for pid in range(self.num_players):
-                keys = PLAYER_KEYS[pid]
-                if key == keys["lane"]:
-                    self.cars[pid].switch_lane()
-                    self.sfx.play("lane_switch")
-                elif key == keys["boost"]:
-                    if self.cars[pid].activate_boost():
-                        self.sfx.play("boost")
-                        self.sfx.play("engine_rev")
-                elif key == keys["honk"]:
-                    self._honk(pid)
+                for action in ACTIONS:
+                    if key == PLAYER_KEYS[pid][action]:
+                        self._player_input(pid, action)
 
         elif self.state == State.FINISH:
             if key == SCAN_KEY:
                 self.state = State.PLAYER_SELECT
 
-    def _honk(self, pid):
-        self.sfx.play(f"honk_{pid}")
-        self.honk_timers[pid] = 0.5
+    def _player_input(self, pid, action):
+        # Recorded whether or not it takes effect; replaying it does the same.
+        # Sounds and the like follow from the events it puts on the bus
+        self.replay.record(self.sim.tick, pid, action)
+        self.sim.apply_input(pid, action)
+
+    def _save_replay(self):
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        save_replay(os.path.join(REPLAY_DIR, f"race_{stamp}{REPLAY_EXT}"), self.replay)
+
+    def _save_telemetry(self):
+        os.makedirs(TELEMETRY_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.sim.bus.export_npz(os.path.join(TELEMETRY_DIR, f"race_{stamp}.npz"),
+                                track=self.track.name, seed=self.replay.seed, tick=TICK)
 
     def _start_race(self):
-        self.track = self.all_tracks[self.selected_track_idx]
-        self.track._surface = None
-        self.cars = []
-        for i in range(self.num_players):
-            sprite = self.car_sprites.get(i)
-            self.cars.append(Car(i, self.track, sprite))
-        self.items = create_track_items(self.track)
-        self.race = RaceManager(self.cars, self.track)
+        self.track = self.all_tracks.load(self.selected_track_idx)
+        # Everything random in the race draws from this seed, so the
+        # replay only has to store it and the players' inputs
+        seed = random.getrandbits(32)
+
+        def make_car(i, track, rng, fleet):
+            return Car(i, track, self.car_sprites.get(i), fleet, rng)
+
+        self.sim = new_race(self.track, self.num_players, seed, make_car=make_car, make_item=Item)
+        self.cars = self.sim.cars
+        self.items = self.sim.items
+        self.race = self.sim.race
+        self.replay = Replay.for_race(self.track, seed, self.num_players, self.race.laps)
         self.honk_timers.clear()
-        self.particles = ParticleSystem()
+        self.boost_ticks = 0
+        # Effects get their own stream so they never disturb the race's
+        self.particles = ParticleSystem(random.Random(f"effects-{seed}"))
+        bus = self.sim.bus
+        self.sfx.subscribe(bus)
+        bus.subscribe(("boost_pickup", "mystery_box", "oil_slick", "finish"), self._emit_particles)
+        bus.subscribe("honk", self._show_honk)
+        bus.subscribe("finish", self._finish_race)
         self.state = State.COUNTDOWN
         self.countdown_timer = 0.0
         self.countdown_value = 3
@@ -152,6 +194,7 @@ class Game:
                 del self.honk_timers[pid]
 
         self.particles.update(dt)
+        self.profiler.mark("particle_update")
 
         if self.state == State.SCANNING:
             self.preview_surf = self.scanner.get_preview_surface()
@@ -164,6 +207,10 @@ class Game:
                 self.scan_player += 1
                 if self.scan_player >= self.num_players:
                     self.scanner.close()
+                    # Broken track files drop out here, before any index
+                    # into the list is shown to the players
+                    self.all_tracks.validate()
+                    self.selected_track_idx = min(self.selected_track_idx, len(self.all_tracks) - 1)
                     self.state = State.TRACK_SELECT
                 else:
                     self.state = State.SCANNING
@@ -183,43 +230,67 @@ class Game:
                     self.sfx.start_engine()
 
         elif self.state == State.RACING:
-            for car in self.cars:
-                car.update(dt)
-                if car.boost_timer > 0:
-                    self.particles.emit_boost(car.pos[0], car.pos[1], car.angle)
-            for item in self.items:
-                item.update(dt)
-                for car in self.cars:
-                    if item.check_collision(car):
-                        if item.item_type in ("boost_pickup", "mystery_box"):
-                            self.sfx.play("pickup")
-                            self.particles.emit_pickup(
-                                item.pos[0], item.pos[1],
-                                (80, 170, 255) if item.item_type == "boost_pickup" else (255, 120, 255),
-                            )
-                        elif item.item_type == "oil_slick":
-                            self.sfx.play("oil")
-                            self.particles.emit_oil_hit(car.pos[0], car.pos[1])
-            self.race.update(dt)
-            if self.race.is_finished():
-                self.sfx.stop_engine()
-                self.sfx.play("finish")
-                winner = self.race.get_winner()
-                if winner:
-                    self.particles.emit_finish(winner.pos[0], winner.pos[1])
-                self.state = State.FINISH
+            self.sim.step(dt, self.profiler.mark if self.profiler.enabled else None)
+            # Boost trails are emitted at draw time, where the cars are shown
+            self.boost_ticks += 1
 
         elif self.state == State.FINISH:
             self.finish_fireworks_timer += dt
             if self.finish_fireworks_timer > 0.4:
                 self.finish_fireworks_timer = 0.0
-                import random
+                rng = self.particles.rng
                 self.particles.emit_finish(
-                    random.randint(WIDTH // 4, WIDTH * 3 // 4),
-                    random.randint(HEIGHT // 4, HEIGHT // 2),
+                    rng.randint(WIDTH // 4, WIDTH * 3 // 4),
+                    rng.randint(HEIGHT // 4, HEIGHT // 2),
                 )
 
-    def _render(self):
+    def _emit_particles(self, tick, kind, car, waypoint, value):
+        x, y = self.cars[car].pos
+        if kind in ("boost_pickup", "mystery_box"):
+            item = self.items[int(value)]
+            self.particles.emit_pickup(
+                item.pos[0], item.pos[1],
+                (80, 170, 255) if kind == "boost_pickup" else (255, 120, 255),
+            )
+        elif kind == "oil_slick":
+            self.particles.emit_oil_hit(x, y)
+        elif kind == "finish":
+            self.particles.emit_finish(x, y)
+
+    def _show_honk(self, tick, kind, car, waypoint, value):
+        self.honk_timers[car] = 0.5
+
+    def _finish_race(self, tick, kind, car, waypoint, value):
+        self._save_replay()
+        self._save_telemetry()
+        self.state = State.FINISH
+
+    def _present(self, drawn):
+        """Show the frame; drawn is None when the whole screen was redrawn."""
+        overlay = self.profiler.render(self.screen)
+        if drawn is not None:
+            drawn.append(overlay)
+        self.profiler.mark("overlay")
+        rects = None
+        if self.dirty is not None:
+            if drawn is None:
+                self.dirty.invalidate()
+            else:
+                rects = self.dirty.frame(drawn)
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        self.profiler.mark("flip")
+
+    def _render(self, alpha=1.0):
+        """Draw the frame; returns the rects drawn if only part was redrawn.
+
+        That is only while racing with DIRTY_RECTS on: the areas drawn last
+        frame are restored from the track and everything drawn again.
+        """
+        if self.state == State.RACING and self.dirty:
+            return self._render_race(alpha, self.dirty.stale)
         self.screen.fill((26, 26, 46))
 
         if self.state == State.PLAYER_SELECT:
@@ -239,43 +310,68 @@ class Game:
             for item in self.items:
                 item.render(self.screen)
             for car in self.cars:
-                car.render(self.screen)
+                car.render(self.screen, alpha, self.glow)
+            self.glow.composite(self.screen)
             self.hud.render_countdown(self.screen, self.countdown_value)
 
         elif self.state == State.RACING:
-            self.track.render(self.screen)
-            for item in self.items:
-                item.render(self.screen)
-            for car in self.cars:
-                car.render(self.screen)
-            self.particles.render(self.screen)
-            self._render_honks()
-            self.hud.render_race(self.screen, self.race)
+            self._render_race(alpha)
+            return None
 
         elif self.state == State.FINISH:
             self.track.render(self.screen)
             for car in self.cars:
-                car.render(self.screen)
+                car.render(self.screen, alpha, self.glow)
             self.particles.render(self.screen)
+            self.glow.composite(self.screen)
             self.hud.render_finish(self.screen, self.race)
+        # Other screens are charged to the HUD as a whole
+        self.profiler.mark("hud")
+
+    def _render_race(self, alpha, restore=None):
+        mark = self.profiler.mark
+        self.track.render(self.screen, restore)
+        mark("track")
+        drawn = [item.render(self.screen) for item in self.items]
+        mark("items")
+        # Everything pinned to a car follows its interpolated pose, not the
+        # last tick's position, so it doesn't jitter against the sprite
+        poses = [car.pose_at(alpha) for car in self.cars]
+        drawn += [car.render(self.screen, alpha, self.glow) for car in self.cars]
+        mark("cars")
+        self._emit_boost(poses)
+        drawn += self.particles.render(self.screen)
+        mark("particle_render")
+        drawn += self._render_honks(poses)
+        drawn += self.glow.composite(self.screen)
+        mark("glow")
+        drawn += self.hud.render_race(self.screen, self.race, poses)
+        mark("hud")
+        return drawn
+
+    def _emit_boost(self, poses):
+        """One burst of boost trail per tick run since the last frame."""
+        for _ in range(self.boost_ticks):
+            for car, (x, y, angle) in zip(self.cars, poses):
+                if car.boost_timer > 0:
+                    self.particles.emit_boost(x, y, angle)
+        self.boost_ticks = 0
 
-    def _render_honks(self):
+    def _render_honks(self, poses):
+        drawn = []
         for pid, timer in self.honk_timers.items():
             if pid < len(self.cars):
-                car = self.cars[pid]
                 color = PLAYER_COLORS[pid % 4]
-                cx, cy = int(car.pos[0]), int(car.pos[1])
+                cx, cy = int(poses[pid][0]), int(poses[pid][1])
                 # Expanding ring with fade
                 progress = 1.0 - (timer / 0.5)
                 radius = int(25 + progress * 35)
                 alpha = int(200 * (timer / 0.5))
-                ring = pygame.Surface((radius * 2 + 4, radius * 2 + 4), pygame.SRCALPHA)
-                pygame.draw.circle(ring, (*color, alpha), (radius + 2, radius + 2), radius, 3)
-                self.screen.blit(ring, (cx - radius - 2, cy - radius - 2))
+                self.glow.add(cx, cy, radius, color, alpha, 3)
                 if timer > 0.2:
-                    font = pygame.font.Font(None, 28)
-                    txt = font.render("HONK!", True, color)
-                    self.screen.blit(txt, txt.get_rect(center=(cx, cy - 45)))
+                    txt = self.hud.text.render(self.honk_font, "HONK!", color)
+                    drawn.append(self.screen.blit(txt, txt.get_rect(center=(cx, cy - 45))))
+        return drawn
 
 
 if __name__ == "__main__":
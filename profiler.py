@@ -0,0 +1,144 @@
+import csv
+import os
+import time
+
+import numpy as np
+import pygame
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+# Frames of timings kept for the overlay and the CSV
+PROFILE_FRAMES = 600
+# Parts of a frame timed separately, in the order they run
+PROFILE_STAGES = ("particle_update", "car_update", "collisions", "race", "events",
+                  "track", "items", "cars", "particle_render", "glow", "hud", "overlay", "flip")
+# Frames between refreshes of the overlay's numbers
+OVERLAY_REFRESH = 15
+# Surfaces made so far, as reported through surface_made
+_made = 0
+_COLUMNS = ("frame_ms",) + tuple(f"{s}_ms" for s in PROFILE_STAGES) + ("particles", "surfaces")
+
+
+class FrameProfiler:
+    """Per-stage frame timings in a ring buffer, with an on-screen overlay.
+
+    Code calls mark(stage) after each stage; the time since the previous
+    mark is charged to that stage. While disabled, mark is a no-op and
+    nothing is recorded.
+    """
+
+    def __init__(self, frames=PROFILE_FRAMES):
+        self.enabled = False
+        self.mark = _ignore
+        # One row per frame: total, each stage, live particles, surfaces made
+        self.rows = np.zeros((frames, len(_COLUMNS)))
+        self.count = 0
+        self._stage = {s: i for i, s in enumerate(PROFILE_STAGES, start=1)}
+        self._current = np.zeros(len(_COLUMNS))
+        self._start = self._last = 0.0
+        self._made_at = 0
+        self._overlay = None
+        self._panel = None
+        self._font = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if self.enabled:
+            if self._panel is None:
+                pygame.font.init()
+                self._font = pygame.font.SysFont("monospace", 15)
+                self._panel = pygame.Surface((380, 18 * (len(_COLUMNS) + 1) + 90), pygame.SRCALPHA)
+            self.mark = self._mark
+            self._start = self._last = time.perf_counter()
+            self._made_at = _made
+        else:
+            self.mark = _ignore
+            self._overlay = None
+
+    def _mark(self, stage):
+        now = time.perf_counter()
+        self._current[self._stage[stage]] += (now - self._last) * 1000
+        self._last = now
+
+    def frame(self, particles=0):
+        """Close the frame just drawn and start timing the next one."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        row = self._current
+        row[0] = (now - self._start) * 1000
+        row[-2] = particles
+        row[-1] = _made - self._made_at
+        self.rows[self.count % len(self.rows)] = row
+        self.count += 1
+        row[:] = 0
+        self._made_at = _made
+        self._start = self._last = now
+
+    def recent(self):
+        """The recorded rows, oldest first."""
+        n = len(self.rows)
+        if self.count <= n:
+            return self.rows[:self.count]
+        return np.roll(self.rows, -(self.count % n), axis=0)
+
+    def summary(self):
+        """{column: (p50, p95, p99)} over the recorded frames."""
+        rows = self.recent()
+        if not len(rows):
+            return {}
+        pct = np.percentile(rows, (50, 95, 99), axis=0)
+        return {name: tuple(pct[:, i]) for i, name in enumerate(_COLUMNS)}
+
+    def export_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            out = csv.writer(f)
+            out.writerow(("frame",) + _COLUMNS)
+            first = self.count - len(self.recent())
+            for i, row in enumerate(self.recent().tolist()):
+                out.writerow([first + i] + [round(v, 3) for v in row])
+
+    def render(self, surface):
+        """Draw the stats box and frame-time graph; returns the rect used."""
+        if not self.enabled:
+            return None
+        if self._overlay is None or self.count % OVERLAY_REFRESH == 0:
+            self._overlay = self._build_overlay()
+        rect = surface.blit(self._overlay, (surface.get_width() - self._overlay.get_width() - 10, 100))
+        # Frame times, newest on the right; the line marks a 60 FPS frame
+        gx, gy, gw, gh = rect.x + 10, rect.bottom - 70, rect.width - 20, 60
+        times = self.recent()[-gw:, 0]
+        if len(times) > 1:
+            ys = gy + gh - np.minimum(times / 50.0, 1.0) * gh
+            pts = np.column_stack((gx + gw - len(times) + np.arange(len(times)), ys)).astype(int).tolist()
+            pygame.draw.lines(surface, (120, 255, 120), False, pts)
+        line = gy + gh - int(gh * (1000 / 60) / 50.0)
+        pygame.draw.line(surface, (255, 80, 80), (gx, line), (gx + gw, line))
+        return rect
+
+    def _build_overlay(self):
+        stats = self.summary()
+        lines = ["stage              p50    p95    p99  (ms)"]
+        for name in _COLUMNS[:-2]:
+            p50, p95, p99 = stats.get(name, (0, 0, 0))
+            lines.append(f"{name[:-3]:<16}{p50:7.2f}{p95:7.2f}{p99:7.2f}")
+        last = self.recent()[-1] if self.count else self._current
+        lines.append(f"particles {int(last[-2])}   surfaces/frame {int(last[-1])}")
+        panel = self._panel
+        panel.fill((0, 0, 0, 170))
+        for i, text in enumerate(lines):
+            panel.blit(self._font.render(text, True, (230, 230, 230)), (10, 6 + 18 * i))
+        return panel
+
+
+def surface_made(n=1):
+    """Count Surfaces made while drawing, for the profiler's surfaces column.
+
+    The places that build Surfaces outside of setup (text, HUD layers,
+    cards, thumbnails, glow stamps, camera frames) report in here.
+    """
+    global _made
+    _made += n
+
+
+def _ignore(stage):
+    pass
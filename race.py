@@ -1,21 +1,39 @@
-from controls import TOTAL_LAPS
+import numpy as np
+
+TOTAL_LAPS = 5
+# Standing of finished cars, less their place in finished_order
+_FINISHED = 1e9
 
 
 class RaceManager:
-    def __init__(self, cars, track):
+    def __init__(self, cars, track, laps=TOTAL_LAPS):
         self.cars = cars
         self.track = track
+        self.laps = laps
         self.started = False
         self.race_time = 0.0
         self.finished_order = []
         self.grace_timer = None
+        # Live standings: indices into cars, leader first, and each car's place
+        self._order = list(range(len(cars)))
+        self._place = {car: i for i, car in enumerate(cars)}
+        self._groups = _by_fleet(cars)
+        self.timing = LapTimer(self)
+
+    def update(self, dt, finishers=None):
+        """Advance the race clock, record cars that completed their laps and
+        update the standings.
 
-    def update(self, dt):
+        finishers narrows the check to cars that may have just finished;
+        every car is checked by default.
+        """
         if not self.started:
+            self._rerank()
             return
         self.race_time += dt
-        for car in self.cars:
-            if not car.finished and car.lap >= TOTAL_LAPS:
+        self.timing.update(self.race_time, dt)
+        for car in self.cars if finishers is None else finishers:
+            if not car.finished and car.lap >= self.laps:
                 car.finished = True
                 car.finish_time = self.race_time
                 self.finished_order.append(car)
@@ -23,13 +41,64 @@ class RaceManager:
                     self.grace_timer = 5.0
         if self.grace_timer is not None:
             self.grace_timer -= dt
+        self._rerank()
 
     def get_positions(self):
-        def key(car):
-            if car.finished:
-                return (-TOTAL_LAPS - 1, car.finish_time or 0)
-            return (-car.lap, -car.waypoint_idx)
-        return sorted(self.cars, key=key)
+        """Cars leader first."""
+        self._rerank()
+        return [self.cars[i] for i in self._order]
+
+    def position(self, car):
+        """1-based race position of car as of the last update."""
+        return self._place[car] + 1
+
+    def standings(self):
+        """How far along every car is, as one number each (higher is ahead).
+
+        Laps plus the fraction of the lap covered, measured continuously
+        along the track rather than by waypoint; finishers rank above
+        everyone in the order they finished.
+        """
+        keys = self.distances() / self.track.num_waypoints
+        placed = None
+        for fleet, rows, idx in self._groups:
+            k = keys[idx]
+            done = fleet.finished[rows]
+            if done.any():
+                if placed is None:
+                    placed = {car: i for i, car in enumerate(self.finished_order)}
+                last = len(self.finished_order)
+                k[done] = [_FINISHED - placed.get(self.cars[i], last) for i in idx[done].tolist()]
+            keys[idx] = k
+        return keys
+
+    def distances(self):
+        """Every car's distance since lap 0 began, in waypoints."""
+        out = np.empty(len(self.cars))
+        n = self.track.num_waypoints
+        for fleet, rows, idx in self._groups:
+            out[idx] = fleet.lap[rows] * n + fleet.progress[rows]
+        return out
+
+    def _rerank(self):
+        """Bring the standings up to date by swapping out-of-order neighbours.
+
+        Between two looks only a few cars overtake, so this is one check
+        over the ranking plus a handful of swaps rather than a full sort.
+        """
+        keys = self.standings()
+        order = self._order
+        ranked = keys[order]
+        if not (ranked[1:] > ranked[:-1]).any():
+            return
+        keys = keys.tolist()
+        for i in range(1, len(order)):
+            j = i
+            while j and keys[order[j]] > keys[order[j - 1]]:
+                order[j], order[j - 1] = order[j - 1], order[j]
+                self._place[self.cars[order[j]]] = j
+                j -= 1
+            self._place[self.cars[order[j]]] = j
 
     def is_finished(self):
         if all(c.finished for c in self.cars):
@@ -45,3 +114,79 @@ class RaceManager:
 
     def get_winner(self):
         return self.finished_order[0] if self.finished_order else None
+
+
+class LapTimer:
+    """Lap and sector split times for every car of a race.
+
+    Timing lines sit at the ends of the track's sectors, the last one on
+    the start/finish line. Crossing times are interpolated within the
+    tick, from how far either side of the line the car was at its ends.
+    Everything lives in arrays sized for the whole race up front:
+    splits[car, lap, sector] is the race time car crossed the end of that
+    sector (NaN until it does), and last_lap, best_lap and gap hold each
+    car's latest figures for the HUD. Indices follow race.cars.
+    """
+
+    def __init__(self, race):
+        self.race = race
+        track = race.track
+        n_cars, self.sectors = len(race.cars), len(track.sector_ends)
+        self.splits = np.full((n_cars, race.laps, self.sectors), np.nan)
+        self.last_lap = np.full(n_cars, np.nan)
+        self.best_lap = np.full(n_cars, np.nan)
+        # Seconds behind whoever first crossed the last line each car crossed
+        self.gap = np.full(n_cars, np.nan)
+        self.lap_start = np.zeros(n_cars)
+        # (car index, lap time) for laps completed in the latest update
+        self.completed = []
+        # Timing lines in race order, as distances since lap 0 began
+        laps = np.arange(race.laps)[:, None] * track.num_waypoints
+        self._lines = (laps + track.sector_ends).ravel()
+        self._first = np.full(len(self._lines), np.nan)
+        self._prev = race.distances()
+        # Cars start spread out from the line, so lines behind them don't count
+        self._next = self._lines.searchsorted(self._prev, "right")
+
+    def update(self, now, dt):
+        """Record lines crossed during the tick of length dt ending at now."""
+        self.completed.clear()
+        pos = self.race.distances()
+        lines = self._lines
+        ahead = lines.take(self._next, mode="clip")
+        for i in np.flatnonzero((pos >= ahead) & (self._next < len(lines))).tolist():
+            p0, p1 = self._prev[i], pos[i]
+            k = self._next[i]
+            while k < len(lines) and lines[k] <= p1:
+                self._cross(i, k, now - dt * (p1 - lines[k]) / (p1 - p0))
+                k += 1
+            self._next[i] = k
+        self._prev = pos
+
+    def _cross(self, i, k, t):
+        lap, sector = divmod(k, self.sectors)
+        self.splits[i, lap, sector] = t
+        if np.isnan(self._first[k]):
+            self._first[k] = t
+        self.gap[i] = t - self._first[k]
+        if sector == self.sectors - 1:
+            lap_time = t - self.lap_start[i]
+            self.last_lap[i] = lap_time
+            self.best_lap[i] = np.fmin(self.best_lap[i], lap_time)
+            self.lap_start[i] = t
+            self.completed.append((i, lap_time))
+
+    def sector_times(self):
+        """Seconds spent in each sector, shaped like splits."""
+        flat = self.splits.reshape(len(self.splits), -1)
+        return np.diff(flat, prepend=0.0).reshape(self.splits.shape)
+
+
+def _by_fleet(cars):
+    """(fleet, rows, indices into cars) for each fleet the cars belong to."""
+    groups = {}
+    for i, car in enumerate(cars):
+        rows, idx = groups.setdefault(id(car.fleet), (car.fleet, [], []))[1:]
+        rows.append(car.row)
+        idx.append(i)
+    return [(fleet, np.array(rows), np.array(idx)) for fleet, rows, idx in groups.values()]
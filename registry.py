@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from track import ADAPTIVE_CHORD_ERROR, TRACKS, Track, _chaikin, _thumbnail
+
+TRACKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tracks")
+TRACK_FILE_EXT = ".json"
+
+log = logging.getLogger(__name__)
+
+
+def load_track_file(path):
+    """Read a track file into a Track config dict.
+
+    Track files are JSON objects with "controls" (list of [x, y]) and
+    "color", "bg" and "tarmac" RGB triples, plus optional "name",
+    "max_chord_error" (ADAPTIVE_CHORD_ERROR if missing, null for evenly
+    spaced waypoints), a precomputed "centerline" of waypoints and
+    "sectors", the lap fractions where timing sectors begin. Raises
+    ValueError for anything that isn't a usable track.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        cfg = {
+            "name": str(data.get("name") or _name_from_path(path)),
+            "controls": _points(data["controls"], 3),
+            "color": _rgb(data["color"]),
+            "bg": _rgb(data["bg"]),
+            "tarmac": _rgb(data["tarmac"]),
+        }
+        # Adaptive waypoints unless the file opts out with null
+        cfg["max_chord_error"] = data.get("max_chord_error", ADAPTIVE_CHORD_ERROR)
+        if cfg["max_chord_error"] is not None:
+            cfg["max_chord_error"] = float(cfg["max_chord_error"])
+            if not cfg["max_chord_error"] > 0:
+                raise ValueError("max_chord_error must be positive")
+        if data.get("centerline") is not None:
+            cfg["centerline"] = _points(data["centerline"], 3)
+        if data.get("sectors") is not None:
+            cfg["sectors"] = [float(f) for f in data["sectors"]]
+            bounds = [0.0] + cfg["sectors"] + [1.0]
+            if not all(a < b for a, b in zip(bounds, bounds[1:])):
+                raise ValueError("sectors must rise strictly within (0, 1)")
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+        raise ValueError(f"Bad track file {path}: {exc!r}") from exc
+    return cfg
+
+
+def _points(value, least):
+    points = np.asarray(value, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) < least or not np.isfinite(points).all():
+        raise ValueError(f"expected at least {least} [x, y] points")
+    return [tuple(p) for p in points.tolist()]
+
+
+def _rgb(value):
+    color = tuple(int(c) for c in value)
+    if len(color) != 3 or not all(0 <= c <= 255 for c in color):
+        raise ValueError(f"expected an RGB triple, got {value!r}")
+    return color
+
+
+def save_track_file(path, track, include_centerline=False):
+    """Write a Track out in the track file format."""
+    data = {
+        "name": track.name,
+        "controls": track.controls.tolist(),
+        "color": list(track.color),
+        "bg": list(track.bg_color),
+        "tarmac": list(track.tarmac_color),
+        "sectors": list(track.sectors),
+        "max_chord_error": track.max_chord_error,
+    }
+    if include_centerline:
+        data["centerline"] = np.round(track.centerline_xy, 2).tolist()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def _name_from_path(path):
+    return os.path.splitext(os.path.basename(path))[0].replace("_", " ").title()
+
+
+class TrackInfo:
+    """Registry entry: metadata and thumbnail now, full geometry on demand.
+
+    File-backed entries are not even parsed until something asks for
+    their name, colors or thumbnail.
+    """
+
+    def __init__(self, config=None, path=None):
+        self.path = path
+        self._config = config
+        self._thumbnails = OrderedDict()
+        self._outline = None
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = load_track_file(self.path)
+        return self._config
+
+    @property
+    def name(self):
+        return self.config["name"]
+
+    @property
+    def color(self):
+        return self.config["color"]
+
+    @property
+    def bg_color(self):
+        return self.config["bg"]
+
+    @property
+    def tarmac_color(self):
+        return self.config["tarmac"]
+
+    def render_mini(self, size=(280, 160)):
+        if self._outline is None:
+            cfg = self.config
+            if cfg.get("centerline") is not None:
+                self._outline = np.asarray(cfg["centerline"], dtype=np.float64)
+            else:
+                # The smoothed control polygon is plenty for a thumbnail
+                self._outline = _chaikin(np.asarray(cfg["controls"], dtype=np.float64), iterations=3)
+        return _thumbnail(self._thumbnails, self._outline, size,
+                          self.bg_color, self.tarmac_color, self.color)
+
+    def build(self):
+        return Track(config=self.config)
+
+
+class TrackRegistry:
+    """Built-in circuits followed by every track file in a directory.
+
+    Only the directory listing happens up front; validate() parses the
+    files. Geometry is built when a track is loaded for racing, and just
+    the most recent one is kept.
+    """
+
+    def __init__(self, tracks_dir=TRACKS_DIR):
+        self.entries = [TrackInfo(config=dict(cfg, name=name)) for name, cfg in TRACKS.items()]
+        if os.path.isdir(tracks_dir):
+            for fname in sorted(os.listdir(tracks_dir)):
+                if fname.endswith(TRACK_FILE_EXT):
+                    self.entries.append(TrackInfo(path=os.path.join(tracks_dir, fname)))
+        self._loaded = (None, None)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, idx):
+        return self.entries[idx]
+
+    def validate(self):
+        """Parse every track file now, dropping those that fail.
+
+        Indices only change here, so call it before handing out indices,
+        such as on entering the track-select screen. Returns how many
+        entries were dropped.
+        """
+        good = []
+        for info in self.entries:
+            try:
+                info.config
+            except ValueError as exc:
+                log.warning("Skipping track file: %s", exc)
+                continue
+            good.append(info)
+        dropped = len(self.entries) - len(good)
+        self.entries = good
+        return dropped
+
+    def load(self, idx):
+        info = self[idx]
+        if self._loaded[0] is not info:
+            self._loaded = (info, info.build())
+        return self._loaded[1]
@@ -0,0 +1,96 @@
+import os
+import struct
+
+import cache
+from geometry import TRACKS, TrackGeometry
+from sim import ACTIONS, simulate_race
+
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replays")
+REPLAY_EXT = ".wrr"
+REPLAY_VERSION = 1
+_MAGIC = b"WRRP"
+# magic, version, seed, cars, laps, track fingerprint, track name length
+_HEADER = struct.Struct("<4sBQBB8sB")
+# tick, then player and action packed into one byte
+_INPUT = struct.Struct("<IB")
+
+
+def track_fingerprint(track):
+    """Short digest of a track's waypoints; replays only match the same layout."""
+    return bytes.fromhex(cache.digest(track.centerline_xy))
+
+
+class Replay:
+    """A race's setup plus every player input, enough to re-run it exactly.
+
+    Races are deterministic given the track, seed, car count, lap count and
+    (tick, player, action) inputs, so that is all a replay stores: a 5-lap
+    race with a few hundred key presses comes to a couple of KB.
+    """
+
+    def __init__(self, track_name, fingerprint, seed, n_cars, laps, inputs=None):
+        self.track_name = track_name
+        self.fingerprint = fingerprint
+        self.seed = seed
+        self.n_cars = n_cars
+        self.laps = laps
+        self.inputs = inputs if inputs is not None else []
+
+    @classmethod
+    def for_race(cls, track, seed, n_cars, laps):
+        return cls(track.name, track_fingerprint(track), seed, n_cars, laps)
+
+    def record(self, tick, player, action):
+        self.inputs.append((tick, player, action))
+
+    def to_bytes(self):
+        name = self.track_name.encode("utf-8")[:255]
+        parts = [_HEADER.pack(_MAGIC, REPLAY_VERSION, self.seed, self.n_cars, self.laps,
+                              self.fingerprint, len(name)), name]
+        for tick, player, action in self.inputs:
+            parts.append(_INPUT.pack(tick, player << 2 | ACTIONS.index(action)))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        try:
+            magic, version, seed, n_cars, laps, fingerprint, name_len = _HEADER.unpack_from(data)
+        except struct.error as exc:
+            raise ValueError(f"Truncated replay: {exc}") from exc
+        if magic != _MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"Not a version {REPLAY_VERSION} replay")
+        start = _HEADER.size + name_len
+        name = data[_HEADER.size:start].decode("utf-8")
+        if (len(data) - start) % _INPUT.size:
+            raise ValueError("Truncated replay input list")
+        inputs = []
+        for tick, packed in _INPUT.iter_unpack(data[start:]):
+            player, code = packed >> 2, packed & 3
+            if code >= len(ACTIONS) or player >= n_cars:
+                raise ValueError(f"Corrupt replay input at tick {tick}: player {player}, action {code}")
+            inputs.append((tick, player, ACTIONS[code]))
+        return cls(name, fingerprint, seed, n_cars, laps, inputs)
+
+    def simulate(self, track=None):
+        """Re-run the race headless and return the finished Simulation.
+
+        track defaults to the built-in circuit of the recorded name; pass the
+        TrackGeometry (or Track) for races on track files.
+        """
+        if track is None:
+            if self.track_name not in TRACKS:
+                raise ValueError(f"No built-in track {self.track_name!r}; pass the track to replay on")
+            track = TrackGeometry(self.track_name)
+        if track_fingerprint(track) != self.fingerprint:
+            raise ValueError(f"Replay was recorded on a different layout of {self.track_name!r}")
+        return simulate_race(track, self.n_cars, self.inputs, self.seed, self.laps)
+
+
+def save_replay(path, replay):
+    with open(path, "wb") as f:
+        f.write(replay.to_bytes())
+
+
+def load_replay(path):
+    with open(path, "rb") as f:
+        return Replay.from_bytes(f.read())
@@ -3,6 +3,8 @@ import numpy as np
 import threading
 from PIL import Image
 
+from profiler import surface_made
+
 try:
     import cv2
     HAS_CV2 = True
@@ -76,6 +78,7 @@ class Scanner:
                         (255, 255, 100), 2, tipLength=0.3)
         cv2.putText(rgb, "FRONT", (arrow_x - 22, arrow_bot + 20),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 100), 1)
+        surface_made()
         return pygame.image.frombuffer(rgb.tobytes(), target_size, "RGB")
 
     def start_capture(self):
@@ -0,0 +1,626 @@
+import math
+import random
+
+import numpy as np
+
+from events import EventBus
+from geometry import LANE_WIDTH, NUM_WAYPOINTS, TrackGeometry
+from race import RaceManager, TOTAL_LAPS
+
+# How fast a car slides sideways into its new lane, in lanes per second
+LANE_SHIFT_RATE = 4.5
+# Gap between starting grid slots, as a fraction of the lap
+GRID_GAP = 1 / 30
+# Fixed simulation step, used by simulate_race and Game alike
+TICK = 1 / 60
+# Most ticks a StepClock runs in one frame before dropping time
+MAX_CATCHUP_TICKS = 5
+# Player actions understood by Simulation.apply_input
+ACTIONS = ("lane", "boost", "honk")
+# A car touches an item when their centers are this plus the item radius apart
+CAR_RADIUS = 20
+# Every kind of track item, in the order item_layout places them
+ITEM_TYPES = ("boost_pad", "boost_pickup", "oil_slick", "mystery_box")
+# What Simulation.bus carries. Item hits use the item type and hold the
+# item's index in value; lap holds the lap time, finish the finish time
+EVENT_TYPES = ITEM_TYPES + ("boost", "lane", "honk", "lap", "finish")
+
+
+class CarFleet:
+    """Every car of a race as rows of NumPy arrays, stepped together.
+
+    A tick is a fixed number of array operations however many cars there
+    are, so big AI-filled fields stay cheap. The price is NumPy's per-call
+    overhead, which a small field pays as well, so update() keeps the count
+    of calls down. CarState objects are thin views of one row each, for
+    code that works car by car.
+    """
+
+    def __init__(self, track):
+        self.track = track
+        self.cars = []
+        self.lane = np.zeros(0, dtype=np.int64)
+        self.lane_pos = np.zeros(0)
+        self.dist_lane = np.zeros(0, dtype=np.int64)
+        self.distance = np.zeros(0)
+        self.base_speed = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.boost_charges = np.zeros(0, dtype=np.int64)
+        self.boost_timer = np.zeros(0)
+        self.slow_timer = np.zeros(0)
+        self.has_shield = np.zeros(0, dtype=bool)
+        self.lap = np.zeros(0, dtype=np.int64)
+        self.finished = np.zeros(0, dtype=bool)
+        self.waypoint = np.zeros(0, dtype=np.int64)
+        # Position, heading and progress (waypoint index plus fraction, the
+        # same in every lane) as columns of one array, now and before the
+        # last update, so a tick saves them with one copy. pos, angle,
+        # progress and their prev_ versions are views into these.
+        self.pose = np.zeros((0, 4))
+        self.prev_pose = np.zeros((0, 4))
+        self._bind_pose()
+        self.finish_time = []
+        # Segment start distances of all three lanes in one sorted array,
+        # each lane shifted into a range of its own, so a single
+        # searchsorted finds the segment of every car whatever its lane.
+        # That is O(log n) per car, but it is one call; an O(1) bucket
+        # lookup takes several NumPy calls and measures 2-4x slower.
+        arc = track.lane_arc_length
+        span = float(arc[:, -1].max()) + 1.0
+        self._lane_shift = np.arange(3) * span
+        self._keys = (arc[:, :-1] + self._lane_shift[:, None]).ravel()
+        self._lap_length = arc[:, -1].copy()
+        self._shortest_lap = float(self._lap_length.min())
+        self._segments = _segment_table(track)
+
+    def __len__(self):
+        return len(self.cars)
+
+    def add(self, car):
+        """Append a row for car, returning its index."""
+        for name, value in _FLEET_DEFAULTS:
+            arr = getattr(self, name)
+            setattr(self, name, np.concatenate((arr, np.full((1,) + arr.shape[1:], value, dtype=arr.dtype))))
+        self._bind_pose()
+        self.finish_time.append(None)
+        self.cars.append(car)
+        return len(self.cars) - 1
+
+    def _bind_pose(self):
+        self.pos, self.angle, self.progress = self.pose[:, :2], self.pose[:, 2], self.pose[:, 3]
+        self.prev_pos, self.prev_angle, self.prev_progress = (
+            self.prev_pose[:, :2], self.prev_pose[:, 2], self.prev_pose[:, 3])
+
+    def update(self, dt, rows=slice(None)):
+        """Advance the unfinished cars among rows (all by default) by dt seconds."""
+        self.prev_pose[rows] = self.pose[rows]
+        # Rare cases are tested on plain lists: on a handful of cars a NumPy
+        # reduction costs more than the work it would let us skip
+        if True in self.finished[rows].tolist():
+            rows = np.arange(len(self.cars))[rows]
+            rows = rows[~self.finished[rows]]
+        boost_timer = self.boost_timer[rows]
+        slow_timer = self.slow_timer[rows]
+        speed = self.base_speed[rows]
+        if np.count_nonzero(boost_timer) or np.count_nonzero(slow_timer):
+            boosting = boost_timer > 0
+            slowed = slow_timer > 0
+            slowed &= ~boosting
+            self.boost_timer[rows] = np.maximum(boost_timer - boosting * dt, 0)
+            self.slow_timer[rows] = np.maximum(slow_timer - slowed * dt, 0)
+            # Boost doubles speed, oil halves it, and boost wins over oil
+            speed = boosting + 1.0
+            speed -= slowed * 0.5
+            speed *= self.base_speed[rows]
+        self.speed[rows] = speed
+
+        lane = self.lane[rows]
+        moved = self.dist_lane[rows] != lane
+        if True in moved.tolist():
+            self._remap_lanes(np.arange(len(self.cars))[rows][moved])
+        lane_pos = self.lane_pos[rows]
+        if True in (lane_pos != lane).tolist():
+            step = LANE_SHIFT_RATE * dt
+            self.lane_pos[rows] = np.where(
+                lane_pos < lane, np.minimum(lane_pos + step, lane), np.maximum(lane_pos - step, lane))
+
+        distance = self.distance[rows] + speed * (dt * 60)
+        if max(distance.tolist(), default=0.0) >= self._shortest_lap:
+            length = self._lap_length[lane]
+            if True in (distance >= length).tolist():
+                laps, distance = np.divmod(distance, length)
+                self.lap[rows] += laps.astype(np.int64)
+        self.distance[rows] = distance
+        self.place(rows)
+
+    def _remap_lanes(self, rows):
+        """Carry distance over to a new lane at the same waypoint fraction."""
+        n = self.track.num_waypoints
+        old, new = self.dist_lane[rows], self.lane[rows]
+        distance = self.distance[rows]
+        g = self._segment(old, distance)
+        seg = self._segments.take(g, axis=1)
+        frac = (distance - seg[0]) * seg[1]
+        seg = self._segments.take(g + (new - old) * n, axis=1)
+        self.distance[rows] = seg[0] + frac * seg[12]
+        self.dist_lane[rows] = new
+
+    def _segment(self, lane, distance):
+        """Column of _segments holding each distance along its lane."""
+        # Column 0 of _segments is padding, so the insertion point is the
+        # column itself and needs no - 1
+        return self._keys.searchsorted(distance + self._lane_shift[lane], "right")
+
+    def place(self, rows=slice(None)):
+        """Derive waypoint, position and heading from distance along the lane."""
+        distance = self.distance[rows]
+        seg = self._segments.take(self._segment(self.lane[rows], distance), axis=1)
+        frac = distance - seg[0]
+        frac *= seg[1]
+        # Lanes are centerline offsets along the normals, so lerping both
+        # lets the car slide smoothly between lanes
+        pose = seg[6:10] * frac
+        pose += seg[2:6]
+        pose[2:] *= (self.lane_pos[rows] - 1) * LANE_WIDTH
+        pose[:2] += pose[2:]
+        pose[2] = seg[10]
+        np.add(seg[11], frac, out=pose[3])
+        self.pose[rows] = pose.T
+        self.waypoint[rows] = seg[11]
+
+
+def _segment_table(track):
+    """Everything place() needs about each lane segment, one column apiece.
+
+    Columns run lane by lane, waypoint by waypoint, after one column of
+    padding. Rows: start distance, 1 / length, centerline start (x, y),
+    normal start, centerline delta, normal delta, lane heading in degrees,
+    waypoint index, length.
+    """
+    arc = track.lane_arc_length
+    n = track.num_waypoints
+    i = np.arange(n)
+    j = (i + 1) % n
+    c, nrm = track.centerline_xy.T, track.normals_xy.T
+    d = track.lanes_xy[:, j] - track.lanes_xy[:, i]
+    length = np.diff(arc, axis=1)
+    table = np.empty((13, 3, n))
+    table[0] = arc[:, :-1]
+    table[1] = 1 / np.maximum(length, 1e-9)
+    table[2:4] = c[:, None]
+    table[4:6] = nrm[:, None]
+    table[6:8] = (c[:, j] - c)[:, None]
+    table[8:10] = (nrm[:, j] - nrm)[:, None]
+    table[10] = np.degrees(np.arctan2(-d[..., 1], d[..., 0])) - 90
+    table[11] = i
+    table[12] = length
+    return np.concatenate((np.zeros((13, 1)), table.reshape(13, -1)), axis=1)
+
+
+# Array name and initial value of each per-car row in a CarFleet
+_FLEET_DEFAULTS = (
+    ("lane", 1), ("lane_pos", 1.0), ("dist_lane", 1), ("distance", 0.0),
+    ("base_speed", 3.0), ("speed", 3.0), ("boost_charges", 0),
+    ("boost_timer", 0.0), ("slow_timer", 0.0), ("has_shield", False),
+    ("lap", 0), ("finished", False), ("waypoint", 0), ("pose", 0.0), ("prev_pose", 0.0),
+)
+
+
+def _column(name, kind):
+    """Property reading and writing one CarFleet array at the car's row."""
+    def get(self):
+        return kind(getattr(self.fleet, name)[self.row])
+
+    def set(self, value):
+        getattr(self.fleet, name)[self.row] = value
+    return property(get, set)
+
+
+class CarState:
+    """One car of a CarFleet. Car adds the sprite.
+
+    Without a fleet the car gets a fleet of its own, so it can still be
+    updated on its own.
+    """
+
+    lane = _column("lane", int)
+    lane_pos = _column("lane_pos", float)
+    distance = _column("distance", float)
+    base_speed = _column("base_speed", float)
+    speed = _column("speed", float)
+    boost_charges = _column("boost_charges", int)
+    boost_timer = _column("boost_timer", float)
+    slow_timer = _column("slow_timer", float)
+    has_shield = _column("has_shield", bool)
+    lap = _column("lap", int)
+    finished = _column("finished", bool)
+    angle = _column("angle", float)
+
+    def __init__(self, player_id, track, rng=random, fleet=None):
+        self.player_id = player_id
+        self.track = track
+        self.fleet = fleet if fleet is not None else CarFleet(track)
+        self.row = self.fleet.add(self)
+        self.base_speed = 3.0 + rng.uniform(-0.15, 0.15)
+        self.speed = self.base_speed
+        self.waypoint_idx = track.index_at(player_id * GRID_GAP)
+
+    @property
+    def pos(self):
+        return self.fleet.pos[self.row]
+
+    @pos.setter
+    def pos(self, value):
+        self.fleet.pos[self.row] = value
+
+    @property
+    def finish_time(self):
+        return self.fleet.finish_time[self.row]
+
+    @finish_time.setter
+    def finish_time(self, value):
+        self.fleet.finish_time[self.row] = value
+
+    @property
+    def waypoint_idx(self):
+        return int(self.fleet.waypoint[self.row])
+
+    @waypoint_idx.setter
+    def waypoint_idx(self, idx):
+        """Teleport the car to a waypoint of its current lane."""
+        fleet, row = self.fleet, self.row
+        fleet.dist_lane[row] = fleet.lane[row]
+        fleet.distance[row] = self.track.lane_arc_length[fleet.lane[row], idx % self.track.num_waypoints]
+        fleet.place(slice(row, row + 1))
+        fleet.prev_pose[row] = fleet.pose[row]
+
+    def pose_at(self, alpha):
+        """(x, y, angle) a fraction alpha of the way through the last update."""
+        fleet, row = self.fleet, self.row
+        (x0, y0), (x1, y1) = fleet.prev_pos[row], fleet.pos[row]
+        a0 = fleet.prev_angle[row]
+        turn = (fleet.angle[row] - a0 + 180) % 360 - 180
+        return x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha, a0 + turn * alpha
+
+    def update(self, dt):
+        self.fleet.update(dt, slice(self.row, self.row + 1))
+
+    def switch_lane(self):
+        self.lane = (self.lane + 1) % 3
+
+    def activate_boost(self):
+        if self.boost_charges > 0 and self.boost_timer <= 0:
+            self.boost_charges -= 1
+            self.boost_timer = 2.5
+            return True
+        return False
+
+
+class ItemState:
+    """A pickup or hazard on the track. Item adds the drawing."""
+
+    def __init__(self, track, waypoint_idx, lane, item_type, rng=random):
+        self.track = track
+        self.waypoint_idx = waypoint_idx
+        self.lane = lane
+        self.item_type = item_type
+        self.rng = rng
+        self.active = True
+        self.respawn_timer = 0.0
+        pos = track.lanes[lane][waypoint_idx]
+        self.pos = (pos[0], pos[1])
+        self.radius = 16
+
+    def update(self, dt):
+        if not self.active:
+            self.respawn_timer -= dt
+            if self.respawn_timer <= 0:
+                self.active = True
+
+    def check_collision(self, car):
+        """Collect the item if car is touching it right now."""
+        if not self.active:
+            return False
+        if math.hypot(car.pos[0] - self.pos[0], car.pos[1] - self.pos[1]) < self.radius + CAR_RADIUS:
+            return self.collect(car)
+        return False
+
+    def collect(self, car):
+        """Apply the item to a car that reached it; False while respawning."""
+        if not self.active:
+            return False
+        self._apply(car)
+        if self.item_type != "boost_pad":
+            self.active = False
+            self.respawn_timer = 5.0
+        return True
+
+    def _apply(self, car):
+        if self.item_type == "boost_pad":
+            car.boost_timer = max(car.boost_timer, 0.5)
+        elif self.item_type == "boost_pickup":
+            car.boost_charges = min(car.boost_charges + 1, 3)
+        elif self.item_type == "oil_slick":
+            if car.has_shield:
+                car.has_shield = False
+            else:
+                car.slow_timer = 2.0
+        elif self.item_type == "mystery_box":
+            effect = self.rng.choice(["shield", "speed_burst", "boost_pickup"])
+            if effect == "shield":
+                car.has_shield = True
+            elif effect == "speed_burst":
+                car.boost_timer = max(car.boost_timer, 1.5)
+            elif effect == "boost_pickup":
+                car.boost_charges = min(car.boost_charges + 1, 3)
+
+
+def item_layout(track, rng=random):
+    """(waypoint_idx, lane, item_type) of every item placed on a track."""
+    # Slots are laid out on a nominal NUM_WAYPOINTS lap and mapped onto the
+    # track's own waypoints, which may be adaptively spaced
+    layout = []
+    n = NUM_WAYPOINTS
+    spacing = n // 14
+
+    def at(slot):
+        return track.index_at(slot / n)
+
+    for i in range(3):
+        idx = int(n * (i + 0.5) / 3)
+        layout.append((at(idx), 1, "boost_pad"))
+    for i in range(5):
+        idx = (spacing * (i * 3 + 1)) % n
+        layout.append((at(idx), rng.choice([0, 1, 2]), "boost_pickup"))
+    for i in range(4):
+        idx = (spacing * (i * 3 + 2)) % n
+        layout.append((at(idx), rng.choice([0, 2]), "oil_slick"))
+    for i in range(3):
+        idx = (spacing * (i * 4 + 3)) % n
+        layout.append((at(idx), rng.choice([0, 1, 2]), "mystery_box"))
+    return layout
+
+
+class StepClock:
+    """Turns variable frame times into whole simulation ticks.
+
+    advance() banks a frame's time and returns how many ticks to run. Past
+    max_ticks per frame the backlog is dropped, so a long hitch slows the
+    race down for a moment instead of teleporting cars past items. alpha
+    is how far the banked time reaches into the next tick, for rendering
+    between the last two states.
+    """
+
+    def __init__(self, tick=TICK, max_ticks=MAX_CATCHUP_TICKS):
+        self.tick = tick
+        self.max_ticks = max_ticks
+        self.pending = 0.0
+
+    def advance(self, frame_time):
+        self.pending += frame_time
+        ticks = int(self.pending / self.tick)
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.pending %= self.tick
+        else:
+            self.pending -= ticks * self.tick
+        return ticks
+
+    @property
+    def alpha(self):
+        return min(self.pending / self.tick, 1.0)
+
+
+class ItemIndex:
+    """Items bucketed per lane by waypoint, for swept pickup checks.
+
+    Each item covers a window of progress (waypoint index plus fraction)
+    as long as its reach on either side. A car touches an item when the
+    stretch of progress it covered in a tick overlaps the window while it
+    is within reach of the item's lane, so no speed or frame time can skip
+    over one. Windows of all lanes sit in one sorted array, each lane
+    shifted into a range of its own, so finding them costs a couple of
+    binary searches for the whole fleet plus a little work per hit.
+    """
+
+    def __init__(self, track, items):
+        self.items = items
+        self.num_waypoints = n = track.num_waypoints
+        # Progress runs up to two laps once a car's stretch is unwrapped
+        self.lane_span = 4 * n
+        steps = np.arange(n + 1, dtype=np.float64)
+        # A sentinel window that ends before everything else
+        idx, lane, lo, hi = [np.array([-1])], [np.array([0])], [np.array([-np.inf])], [np.array([-np.inf])]
+        self.width = 0.0
+        for k in range(3):
+            members = [i for i, item in enumerate(items) if item.lane == k]
+            if not members:
+                continue
+            arc = track.lane_arc_length[k]
+            at = arc[[items[i].waypoint_idx for i in members]]
+            reach = np.array([items[i].radius + CAR_RADIUS for i in members], dtype=np.float64)
+
+            def progress(d):
+                laps, rest = np.divmod(d, arc[-1])
+                return np.interp(rest, arc, steps) + laps * n
+
+            start, end = progress(at - reach), progress(at + reach)
+            self.width = max(self.width, float((end - start).max()))
+            # Copies a lap either side catch windows that wrap past the
+            # start line and cars whose stretch does
+            for laps in (-1, 0, 1):
+                shift = k * self.lane_span + laps * n
+                idx.append(np.array(members))
+                lane.append(np.full(len(members), k))
+                lo.append(start + shift)
+                hi.append(end + shift)
+        lo = np.concatenate(lo)
+        order = np.argsort(lo, kind="stable")
+        self.idx = np.concatenate(idx)[order]
+        self.lane = np.concatenate(lane)[order]
+        self.lo = lo[order]
+        self.hi = np.concatenate(hi)[order]
+        # Furthest window end among the first j windows, so one lookup
+        # tells whether any window reaching up to a point is still open
+        self.reach_end = np.maximum.accumulate(self.hi)
+        # Plain lists for the per-hit loop, where NumPy scalars are slow
+        self._entries = list(zip(self.hi.tolist(), self.lane.tolist(), self.idx.tolist()))
+
+    def contacts(self, fleet):
+        """(item, row) pairs of items touched by fleet cars this tick."""
+        start = fleet.prev_progress
+        end = fleet.progress.copy()
+        end[end < start] += self.num_waypoints
+        rows = np.flatnonzero(end > start)
+        lane_pos = fleet.lane_pos[rows]
+        lane = lane_pos.astype(np.intp)
+        pairs = self._touching(fleet, rows, lane, start, end)
+        # Cars between lanes can reach the items of both
+        between = lane != lane_pos
+        if np.count_nonzero(between):
+            pairs += self._touching(fleet, rows[between], lane[between] + 1, start, end)
+        # Same order as testing every item against every car
+        return sorted(set(pairs))
+
+    def _touching(self, fleet, rows, lane, start, end):
+        shift = lane * self.lane_span
+        a = start[rows] + shift
+        b = end[rows] + shift
+        # Windows are at most width long, so any that can overlap [a, b]
+        # begins in [a - width, b]
+        first = self.lo.searchsorted(a - self.width)
+        last = self.lo.searchsorted(b, "right")
+        hit = np.flatnonzero(self.reach_end[last - 1] > a)
+        pairs = []
+        lane_pos = fleet.lane_pos
+        for row, lo_a, c0, c1 in zip(rows[hit].tolist(), a[hit].tolist(), first[hit].tolist(), last[hit].tolist()):
+            offset = float(lane_pos[row])
+            for hi, lane_k, i in self._entries[c0:c1]:
+                item = self.items[i]
+                if hi > lo_a and item.active and abs(offset - lane_k) * LANE_WIDTH < item.radius + CAR_RADIUS:
+                    pairs.append((i, row))
+        return pairs
+
+
+class Simulation:
+    """One race: cars, items and standings advanced one tick at a time.
+
+    Nothing here touches pygame, so races can run headless; Game drives
+    the same object and draws it.
+    """
+
+    def __init__(self, track, cars, items, laps=TOTAL_LAPS):
+        self.track = track
+        self.cars = cars
+        self.items = items
+        self.race = RaceManager(cars, track, laps)
+        # Cars sharing a CarFleet are stepped in one go
+        self.fleets = list({id(car.fleet): car.fleet for car in cars}.values())
+        self.item_index = ItemIndex(track, items)
+        # Only items waiting to respawn need a timer update each tick
+        self._respawning = [item for item in items if not item.active]
+        self.tick = 0
+        self.finished = False
+        self.bus = EventBus(EVENT_TYPES)
+
+    def apply_input(self, player, action):
+        """Apply one of ACTIONS for a player; returns whether it took effect."""
+        car = self.cars[player]
+        if action == "lane":
+            car.switch_lane()
+            self.bus.emit(self.tick, "lane", player, car.waypoint_idx, car.lane)
+            return True
+        if action == "boost":
+            if not car.activate_boost():
+                return False
+            self.bus.emit(self.tick, "boost", player, car.waypoint_idx, car.boost_charges)
+            return True
+        if action == "honk":
+            self.bus.emit(self.tick, "honk", player, car.waypoint_idx)
+            return True
+        raise ValueError(f"Unknown action {action!r}")
+
+    def step(self, dt=TICK, mark=None):
+        """Advance one tick and return what happened as (kind, car, item).
+
+        kind is the item type for every pickup or hazard hit, then
+        "finish" with the winner (and no item) when the race ends. The
+        same happenings, plus laps and the inputs applied since the last
+        tick, go out on bus at the end of the tick. mark, if given, is
+        called with each stage's name as it completes, for profiling.
+        """
+        events = []
+        bus = self.bus
+        for fleet in self.fleets:
+            fleet.update(dt)
+        if self._respawning:
+            for item in self._respawning:
+                item.update(dt)
+            self._respawning = [item for item in self._respawning if not item.active]
+        if mark:
+            mark("car_update")
+        for fleet in self.fleets:
+            for k, row in self.item_index.contacts(fleet):
+                item, car = self.items[k], fleet.cars[row]
+                if item.collect(car):
+                    events.append((item.item_type, car, item))
+                    bus.emit(self.tick, item.item_type, car.player_id, item.waypoint_idx, k)
+                    if not item.active:
+                        self._respawning.append(item)
+        if mark:
+            mark("collisions")
+        self.race.update(dt, [
+            fleet.cars[row] for fleet in self.fleets
+            for row in np.flatnonzero((fleet.lap >= self.race.laps) & ~fleet.finished)
+        ])
+        for i, lap_time in self.race.timing.completed:
+            car = self.cars[i]
+            bus.emit(self.tick, "lap", car.player_id, car.waypoint_idx, lap_time)
+        if not self.finished and self.race.is_finished():
+            self.finished = True
+            winner = self.race.get_winner()
+            events.append(("finish", winner, None))
+            bus.emit(self.tick, "finish", winner.player_id, winner.waypoint_idx, winner.finish_time)
+        if mark:
+            mark("race")
+        bus.flush()
+        if mark:
+            mark("events")
+        self.tick += 1
+        return events
+
+
+def new_race(track, n_cars, seed=None, laps=TOTAL_LAPS, make_car=CarState, make_item=ItemState):
+    """Set up a Simulation whose randomness all comes from one seeded RNG.
+
+    make_car(player_id, track, rng, fleet) and make_item(track, idx, lane,
+    item_type, rng) build the cars and items, so Game can pass its drawable
+    subclasses and still get exactly the race a headless run would.
+    """
+    rng = random.Random(seed)
+    fleet = CarFleet(track)
+    cars = [make_car(i, track, rng, fleet) for i in range(n_cars)]
+    items = [make_item(track, idx, lane, kind, rng) for idx, lane, kind in item_layout(track, rng)]
+    return Simulation(track, cars, items, laps)
+
+
+def simulate_race(track, n_cars=4, inputs=(), seed=None, laps=TOTAL_LAPS, dt=TICK, max_time=600.0):
+    """Run a whole race without a display and return the finished Simulation.
+
+    track is a TrackGeometry (or Track) or a track name. inputs is an
+    iterable of (tick, player, action) sorted by tick; each is applied just
+    before that tick is stepped. The same seed and inputs give the same race.
+    """
+    if not isinstance(track, TrackGeometry):
+        track = TrackGeometry(track)
+    sim = new_race(track, n_cars, seed, laps)
+    sim.race.started = True
+    pending = iter(inputs)
+    nxt = next(pending, None)
+    max_ticks = int(max_time / dt)
+    while not sim.finished and sim.tick < max_ticks:
+        while nxt is not None and nxt[0] <= sim.tick:
+            sim.apply_input(nxt[1], nxt[2])
+            nxt = next(pending, None)
+        sim.step(dt)
+    return sim
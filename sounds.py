@@ -1,7 +1,11 @@
+import dis
+import linecache
 import pygame
 import numpy as np
 import math
 
+import cache
+
 SAMPLE_RATE = 44100
 
 
@@ -16,12 +20,12 @@ def _fade(samples, fade_in=500, fade_out=500):
     return samples
 
 
-def _to_sound(samples, volume=0.3):
+def _to_pcm(samples, volume=0.3):
+    """Interleaved 16-bit stereo PCM, the mixer's own format."""
     samples = np.nan_to_num(samples, nan=0.0)
     samples = np.clip(samples, -1, 1)
     pcm = (samples * volume * 32767).astype(np.int16)
-    stereo = np.column_stack((pcm, pcm))
-    return pygame.sndarray.make_sound(stereo)
+    return np.column_stack((pcm, pcm))
 
 
 def _bandpass_noise(n, low_freq, high_freq):
@@ -90,7 +94,7 @@ def _engine_loop(duration=6.0):
     xf = int(SAMPLE_RATE * 0.15)
     s[-xf:] = s[-xf:] * np.linspace(1, 0, xf) + s[:xf] * np.linspace(0, 1, xf)
 
-    return _to_sound(s, 0.07)
+    return _to_pcm(s, 0.07)
 
 
 def _engine_rev(duration=2.0):
@@ -133,7 +137,7 @@ def _engine_rev(duration=2.0):
 
     s = _distort(s, 2.0)
     s = _fade(s, 500, 1000)
-    return _to_sound(s, 0.22)
+    return _to_pcm(s, 0.22)
 
 
 def _boost_whoosh(duration=0.6):
@@ -167,7 +171,7 @@ def _boost_whoosh(duration=0.6):
     s += 0.2 * np.sin(2 * math.pi * 50 * t) * np.exp(-8 * t / duration)
 
     s = _fade(s, 100, 300)
-    return _to_sound(s, 0.28)
+    return _to_pcm(s, 0.28)
 
 
 def _countdown_beep(duration=0.15):
@@ -179,7 +183,7 @@ def _countdown_beep(duration=0.15):
     s += 0.2 * np.sin(2 * math.pi * 2000 * t)
     s += 0.1 * np.sin(2 * math.pi * 3000 * t)
     s = _fade(s, 80, 150)
-    return _to_sound(s, 0.35)
+    return _to_pcm(s, 0.35)
 
 
 def _go_signal(duration=0.6):
@@ -206,7 +210,7 @@ def _go_signal(duration=0.6):
     s += 0.15 * _distort(np.sin(rev_phase) + 0.5 * np.sin(rev_phase * 2), 2.0)
 
     s = _fade(s, 100, 400)
-    return _to_sound(s, 0.35)
+    return _to_pcm(s, 0.35)
 
 
 def _pickup_chime(duration=0.15):
@@ -221,7 +225,7 @@ def _pickup_chime(duration=0.15):
     env = np.exp(-3 * t / duration)
     s *= env
     s = _fade(s, 50, 100)
-    return _to_sound(s, 0.25)
+    return _to_pcm(s, 0.25)
 
 
 def _oil_splat(duration=0.5):
@@ -248,7 +252,7 @@ def _oil_splat(duration=0.5):
     s += 0.15 * debris * debris_env
 
     s = _fade(s, 100, 300)
-    return _to_sound(s, 0.22)
+    return _to_pcm(s, 0.22)
 
 
 def _honk(base_freq, duration=0.35):
@@ -285,7 +289,7 @@ def _honk(base_freq, duration=0.35):
         env[-release:] = np.linspace(1, 0, release) ** 0.5
     s *= env
 
-    return _to_sound(s, 0.28)
+    return _to_pcm(s, 0.28)
 
 
 def _finish_fanfare(duration=2.0):
@@ -332,7 +336,7 @@ def _finish_fanfare(duration=2.0):
     s += 0.10 * pop_noise * pop_env
 
     s = _fade(s, 200, 1500)
-    return _to_sound(s, 0.28)
+    return _to_pcm(s, 0.28)
 
 
 def _lane_switch(duration=0.08):
@@ -345,7 +349,53 @@ def _lane_switch(duration=0.08):
     # Tiny suspension thunk
     s += 0.3 * np.sin(2 * math.pi * 150 * t) * np.exp(-30 * t / duration)
     s = _fade(s, 30, 50)
-    return _to_sound(s, 0.12)
+    return _to_pcm(s, 0.12)
+
+
+# Sounds played for each race event; honks pick the player's own horn
+EVENT_SOUNDS = {
+    "boost_pickup": ("pickup",),
+    "mystery_box": ("pickup",),
+    "oil_slick": ("oil",),
+    "boost": ("boost", "engine_rev"),
+    "lane": ("lane_switch",),
+    "finish": ("finish",),
+}
+
+
+def _source_of(fn):
+    """Source lines of a function, read straight off its code object.
+
+    Much cheaper than inspect.getsource, which tokenizes the whole module.
+    """
+    code = fn.__code__
+    last = max(line for _, line in dis.findlinestarts(code) if line is not None)
+    lines = linecache.getlines(code.co_filename)[code.co_firstlineno - 1:last]
+    return "".join(lines) or code.co_code
+
+
+def synth_pcm(name, generator, *args, helpers=None):
+    """PCM bytes from generator(*args), cached on disk between launches.
+
+    The key covers the generator's source, defaults and arguments, the
+    shared helpers every generator builds on (helpers, their key if
+    already worked out), the sample rate and the mixer's actual format,
+    so editing any of them makes a fresh sound on the next launch.
+    """
+    if helpers is None:
+        helpers = _helpers_key()
+    key = cache.digest(_source_of(generator), generator.__defaults__, args, SAMPLE_RATE,
+                       pygame.mixer.get_init(), helpers)
+    path = cache.entry_path("sounds", name, key, ".pcm")
+    data = cache.read(path)
+    if data is None:
+        data = generator(*args).tobytes()
+        cache.write(path, data)
+    return data
+
+
+def _helpers_key():
+    return cache.digest(*(_source_of(fn) for fn in (_fade, _to_pcm, _bandpass_noise, _distort)))
 
 
 class SoundManager:
@@ -357,25 +407,41 @@ class SoundManager:
         pygame.mixer.set_num_channels(16)
         self._engine_channel = pygame.mixer.Channel(15)
 
-        self.sounds["countdown"] = _countdown_beep()
-        self.sounds["go"] = _go_signal()
-        self.sounds["boost"] = _boost_whoosh()
-        self.sounds["pickup"] = _pickup_chime()
-        self.sounds["oil"] = _oil_splat()
-        self.sounds["finish"] = _finish_fanfare()
-        self.sounds["engine_rev"] = _engine_rev()
-        self.sounds["engine_loop"] = _engine_loop()
-        self.sounds["lane_switch"] = _lane_switch()
-
+        generators = {
+            "countdown": (_countdown_beep,),
+            "go": (_go_signal,),
+            "boost": (_boost_whoosh,),
+            "pickup": (_pickup_chime,),
+            "oil": (_oil_splat,),
+            "finish": (_finish_fanfare,),
+            "engine_rev": (_engine_rev,),
+            "engine_loop": (_engine_loop,),
+            "lane_switch": (_lane_switch,),
+        }
         # Honks — different pitch per player, stadium air horn
         honk_freqs = [320, 400, 260, 480]
         for i, freq in enumerate(honk_freqs):
-            self.sounds[f"honk_{i}"] = _honk(freq)
+            generators[f"honk_{i}"] = (_honk, freq)
+        helpers = _helpers_key()
+        for name, (generator, *args) in generators.items():
+            self.sounds[name] = pygame.mixer.Sound(buffer=synth_pcm(name, generator, *args, helpers=helpers))
 
     def play(self, name):
         if name in self.sounds:
             self.sounds[name].play()
 
+    def subscribe(self, bus):
+        bus.subscribe(tuple(EVENT_SOUNDS) + ("honk",), self.on_event)
+
+    def on_event(self, tick, kind, car, waypoint, value):
+        if kind == "honk":
+            self.play(f"honk_{car}")
+            return
+        if kind == "finish":
+            self.stop_engine()
+        for name in EVENT_SOUNDS[kind]:
+            self.play(name)
+
     def start_engine(self):
         """Start looping engine sound during racing."""
         if self._engine_channel and "engine_loop" in self.sounds:
@@ -0,0 +1,125 @@
+import math
+import numpy as np
+
+
+class TrackIndex:
+    """Grid-bucket index answering "where on the track is this point?".
+
+    Every grid cell stores the waypoints that can be nearest to any point
+    inside it, so a query only measures a few dozen candidates. Points
+    outside the grid fall back to a brute-force search.
+    """
+
+    def __init__(self, centerline, normals, distances, lane_width, cell=24, margin=150):
+        self.points = np.asarray(centerline, dtype=np.float64)
+        self.xs = np.ascontiguousarray(self.points[:, 0])
+        self.ys = np.ascontiguousarray(self.points[:, 1])
+        self.normals = np.asarray(normals, dtype=np.float64)
+        self.distances = np.asarray(distances, dtype=np.float64)
+        self.length = self.distances[-1]
+        self.lane_width = lane_width
+        self.cell = cell
+        n = len(self.points)
+        seg = np.roll(self.points, -1, axis=0) - self.points
+        self.seg_len = np.hypot(seg[:, 0], seg[:, 1])
+        self.tangents = seg / np.where(self.seg_len > 0, self.seg_len, 1)[:, None]
+
+        self.origin = self.points.min(axis=0) - margin
+        extent = self.points.max(axis=0) + margin - self.origin
+        self.shape = np.ceil(extent / cell).astype(int)
+        gx, gy = np.meshgrid(np.arange(self.shape[0]), np.arange(self.shape[1]), indexing="ij")
+        centers = self.origin + (np.column_stack((gx.ravel(), gy.ravel())) + 0.5) * cell
+        d = np.hypot(
+            centers[:, None, 0] - self.points[None, :, 0],
+            centers[:, None, 1] - self.points[None, :, 1],
+        )
+        # Any point in a cell is within half a diagonal of its center, so
+        # its nearest waypoint lies within dmin + a full diagonal of it
+        reach = d.min(axis=1) + cell * math.sqrt(2)
+        rows, cols = np.nonzero(d <= reach[:, None])
+        counts = np.bincount(rows, minlength=len(centers))
+        rank = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        # Cells near the track have a few dozen candidates while cells far
+        # off it can have hundreds, so cells are grouped into power-of-two
+        # width tiers and each tier is padded only to its own width
+        widths = 2 ** np.ceil(np.log2(np.maximum(counts, 8))).astype(int)
+        self.tier_widths = np.unique(widths)
+        self.cell_tier = np.searchsorted(self.tier_widths, widths).astype(np.int8)
+        self.cell_row = np.empty(len(centers), dtype=np.int64)
+        self.tiers = []
+        for t, width in enumerate(self.tier_widths):
+            cells = np.flatnonzero(self.cell_tier == t)
+            self.cell_row[cells] = np.arange(len(cells))
+            table = np.empty((len(cells), width), dtype=np.intp)
+            pick = self.cell_tier[rows] == t
+            table[self.cell_row[rows[pick]], rank[pick]] = cols[pick]
+            # Pad short rows with their first candidate so queries need no mask
+            filled = np.arange(width) < counts[cells][:, None]
+            self.tiers.append(np.where(filled, table, table[:, :1]))
+        self.num_waypoints = n
+
+    def query(self, points, chunk=4096):
+        """Locate an (M, 2) array of points.
+
+        Returns (waypoint_idx, lane, lateral_offset, distance) arrays:
+        the nearest waypoint, the nearest lane (0-2), the signed offset from
+        the centerline along its normal, and the arc length along the
+        centerline from the start line. Points with
+        abs(lateral_offset) > TRACK_WIDTH / 2 are off the tarmac.
+        """
+        p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        nearest = np.empty(len(p), dtype=np.intp)
+        # Chunking keeps the (chunk, width) candidate arrays cache-resident
+        for start in range(0, len(p), chunk):
+            nearest[start:start + chunk] = self._nearest(p[start:start + chunk])
+
+        # Project onto whichever segment around the waypoint the point is on
+        rel = p - self.points[nearest]
+        before = np.einsum("mj,mj->m", rel, self.tangents[nearest]) < 0
+        seg = np.where(before, nearest - 1, nearest) % self.num_waypoints
+        rel = p - self.points[seg]
+        along = np.clip(np.einsum("mj,mj->m", rel, self.tangents[seg]), 0, self.seg_len[seg])
+        offset = np.einsum("mj,mj->m", rel, self.normals[seg])
+        distance = (self.distances[seg] + along) % self.length
+        lane = np.clip(np.rint(offset / self.lane_width) + 1, 0, 2).astype(np.int64)
+        return nearest, lane, offset, distance
+
+    def locate(self, x, y):
+        """Single-point form of query(), returning plain Python scalars."""
+        idx, lane, offset, distance = self.query(((x, y),))
+        return int(idx[0]), int(lane[0]), float(offset[0]), float(distance[0])
+
+    def _nearest(self, p):
+        g = np.floor((p - self.origin) / self.cell).astype(np.intp)
+        inside = np.all((g >= 0) & (g < self.shape), axis=1)
+        nearest = np.empty(len(p), dtype=np.intp)
+        if not inside.all():
+            nearest[~inside] = self._brute_force(p[~inside])
+            p, g = p[inside], g[inside]
+        cells = g[:, 0] * self.shape[1] + g[:, 1]
+        tier = self.cell_tier[cells]
+        found = np.empty(len(p), dtype=np.intp)
+        for t, table in enumerate(self.tiers):
+            sel = np.flatnonzero(tier == t)
+            if not len(sel):
+                continue
+            pin = p[sel]
+            cand = table.take(self.cell_row[cells[sel]], axis=0)
+            d2 = self.xs.take(cand)
+            d2 -= pin[:, :1]
+            d2 *= d2
+            dy = self.ys.take(cand)
+            dy -= pin[:, 1:]
+            dy *= dy
+            d2 += dy
+            found[sel] = cand[np.arange(len(sel)), d2.argmin(axis=1)]
+        nearest[inside] = found
+        return nearest
+
+    def _brute_force(self, points, chunk=4096):
+        out = np.empty(len(points), dtype=np.int64)
+        for start in range(0, len(points), chunk):
+            p = points[start:start + chunk]
+            diff = self.points[None, :, :] - p[:, None, :]
+            out[start:start + chunk] = np.einsum("mkj,mkj->mk", diff, diff).argmin(axis=1)
+        return out
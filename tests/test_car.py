@@ -45,9 +45,67 @@ def test_lap_detection():
         c.update(1 / 60)
     assert c.lap > old_lap, "Car should have completed a lap"
 
+def test_distance_advance_is_exact():
+    from track import Track
+    from car import Car
+    t = Track()
+    c = Car(0, t)
+    c.base_speed = 3.0
+    start = c.distance
+    for _ in range(30):
+        c.update(1 / 60)
+    assert abs(c.distance - (start + 90.0)) < 1e-6
+
+def test_lane_switch_keeps_progress():
+    from track import Track
+    from car import Car
+    t = Track()
+    c = Car(0, t)
+    c.waypoint_idx = 250
+    c.switch_lane()
+    c.update(1 / 60)
+    assert c.waypoint_idx in (250, 251)
+    assert c.lap == 0
+    for _ in range(30):
+        c.update(1 / 60)
+    assert c.lane_pos == c.lane == 2
+
+def test_speed_on_adaptive_track():
+    from track import Track
+    from car import Car
+    import math
+    t = Track("Spa", max_chord_error=0.25)
+    c = Car(1, t)
+    c.base_speed = 3.0
+    start = list(c.pos)
+    c.update(1 / 60)
+    assert abs(math.hypot(c.pos[0] - start[0], c.pos[1] - start[1]) - 3.0) < 0.05
+
+def test_rotations_cover_every_heading():
+    from car import SpriteRotations, _default_sprite
+    rot = SpriteRotations(_default_sprite(0), steps=8)
+    assert len(rot.frames) == 8
+    assert rot.at(0)[0] is rot.at(360)[0] is rot.at(-2)[0]
+    assert rot.at(44)[0] is rot.at(46)[0] is rot.frames[1][0]
+    frame, (ox, oy) = rot.at(90)
+    assert (ox, oy) == (-(frame.get_width() // 2), -(frame.get_height() // 2))
+
+def test_default_cars_share_rotations():
+    from track import Track
+    from car import Car
+    t = Track()
+    a, b, c = Car(0, t), Car(4, t), Car(1, t)
+    assert a.rotations is b.rotations
+    assert a.rotations is not c.rotations
+
 if __name__ == "__main__":
     test_car_advances()
     test_lane_switch()
     test_boost()
     test_lap_detection()
+    test_distance_advance_is_exact()
+    test_lane_switch_keeps_progress()
+    test_speed_on_adaptive_track()
+    test_rotations_cover_every_heading()
+    test_default_cars_share_rotations()
     print("All car tests passed!")
@@ -0,0 +1,35 @@
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_first_frame_is_full():
+    import pygame
+    from dirty import DirtyRects
+    d = DirtyRects((640, 320), tile=64)
+    assert d.stale is None
+    assert d.frame([pygame.Rect(10, 10, 20, 20)]) is None
+    assert d.stale == [pygame.Rect(0, 0, 64, 64)]
+
+def test_dirty_rects_cover_old_and_new():
+    import pygame
+    from dirty import DirtyRects
+    d = DirtyRects((640, 320), tile=64)
+    d.frame([pygame.Rect(10, 10, 20, 20)])
+    rects = d.frame([pygame.Rect(70, 10, 20, 20), pygame.Rect(300, 200, 100, 10), None])
+    assert rects == [pygame.Rect(0, 0, 128, 64), pygame.Rect(256, 192, 192, 64)]
+    assert d.stale == [pygame.Rect(64, 0, 64, 64), pygame.Rect(256, 192, 192, 64)]
+    d.invalidate()
+    assert d.frame([]) is None
+
+def test_large_dirty_area_flips():
+    import pygame
+    from dirty import DirtyRects
+    d = DirtyRects((640, 320), tile=64, threshold=0.5)
+    d.frame([])
+    assert d.frame([pygame.Rect(0, 0, 640, 100)]) == [pygame.Rect(0, 0, 640, 64), pygame.Rect(0, 64, 640, 64)]
+    assert d.frame([pygame.Rect(0, 0, 640, 200)]) is None
+
+if __name__ == "__main__":
+    test_first_frame_is_full()
+    test_dirty_rects_cover_old_and_new()
+    test_large_dirty_area_flips()
+    print("All dirty-rect tests passed!")
@@ -0,0 +1,118 @@
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_glow_stamps_are_cached_by_alpha_level():
+    from effects import glow_stamp
+    a = glow_stamp(10, (255, 200, 50), 120)
+    assert glow_stamp(10, (255, 200, 50), 122) is a
+    assert glow_stamp(10, (255, 200, 50), 200) is not a
+    assert a.get_at((11, 11))[:3] == (119, 93, 23)
+    assert a.get_at((0, 0))[:3] == (0, 0, 0)
+
+def test_glow_layer_adds_overlaps_once():
+    import pygame
+    from effects import GlowLayer
+    screen = pygame.Surface((200, 100))
+    screen.fill((10, 10, 10))
+    glow = GlowLayer(screen.get_size())
+    glow.add(50, 50, 20, (100, 0, 0))
+    glow.add(60, 50, 20, (0, 100, 0))
+    glow.composite(screen)
+    assert screen.get_at((55, 50))[:3] == (110, 110, 10)
+    assert screen.get_at((150, 50))[:3] == (10, 10, 10)
+    assert glow.stamps == []
+    assert glow.layer.get_at((55, 50))[:3] == (0, 0, 0)
+
+def test_car_effects_go_to_glow_layer():
+    import pygame
+    from track import Track
+    from car import Car
+    from effects import GlowLayer
+    from controls import WIDTH, HEIGHT
+    t = Track()
+    c = Car(0, t)
+    c.boost_timer = 1.0
+    c.has_shield = True
+    glow = GlowLayer((WIDTH, HEIGHT))
+    c.render(pygame.Surface((WIDTH, HEIGHT)), 1.0, glow)
+    assert len(glow.stamps) == 7
+
+def test_particles_expire_and_compact():
+    import random
+    from effects import ParticleSystem
+    ps = ParticleSystem(random.Random(3))
+    ps.emit_pickup(100, 100, (255, 0, 0))
+    ps.emit_finish(200, 200)
+    assert len(ps) == 38
+    ps.update(0.5)
+    # Pickup sparks live at most 0.5s; fireworks at least that
+    assert len(ps) == 30
+    assert (ps.life[:30] > 0).all()
+    ps.update(1.0)
+    assert len(ps) == 0
+
+def test_particle_pool_drops_oldest_when_full():
+    import random
+    from effects import ParticleSystem
+    ps = ParticleSystem(random.Random(3), capacity=40)
+    ps.emit_finish(0, 0)
+    ps.emit_oil_hit(500, 500)
+    assert len(ps) == 40
+    assert (ps.x[28:40] == 500).all() and (ps.x[:28] == 0).all()
+
+def test_particles_render_into_pixels():
+    import random
+    import pygame
+    from effects import ParticleSystem
+    surf = pygame.Surface((256, 128))
+    ps = ParticleSystem(random.Random(3))
+    ps.emit_pickup(100, 64, (255, 0, 0))
+    ps.emit_pickup(0, 0, (0, 255, 0))
+    tiles = ps.render(surf)
+    assert surf.get_at((100, 64))[:3] == (255, 0, 0)
+    assert surf.get_at((0, 0))[:3] == (0, 255, 0)
+    assert surf.get_at((200, 64))[:3] == (0, 0, 0)
+    assert pygame.Rect(64, 0, 64, 64) in tiles and pygame.Rect(0, 0, 64, 64) in tiles
+    assert pygame.Rect(192, 64, 64, 64) not in tiles
+
+def test_particles_render_on_other_depths():
+    import random
+    import pygame
+    from effects import ParticleSystem
+    for depth in (8, 16, 24):
+        surf = pygame.Surface((256, 128), depth=depth)
+        surf.fill((0, 0, 0))
+        ps = ParticleSystem(random.Random(3))
+        ps.emit_pickup(100, 64, (255, 0, 0))
+        tiles = ps.render(surf)
+        assert surf.get_at((100, 64))[:3] == surf.unmap_rgb(surf.map_rgb((255, 0, 0)))[:3]
+        assert surf.get_at((200, 100))[:3] == (0, 0, 0)
+        assert pygame.Rect(64, 0, 64, 64) in tiles
+
+
+def test_particles_draw_alike_on_24_and_32_bit():
+    import random
+    import pygame
+    from effects import ParticleSystem
+    ps = ParticleSystem(random.Random(5))
+    for x, y in ((4, 4), (128, 64), (250, 120)):
+        ps.emit_finish(x, y)
+    ps.update(0.1)
+    images = []
+    for depth in (24, 32):
+        surf = pygame.Surface((256, 128), depth=depth)
+        ps.render(surf)
+        images.append(pygame.surfarray.array3d(surf))
+    assert images[0].any()
+    assert (images[0] == images[1]).all()
+
+if __name__ == "__main__":
+    test_glow_stamps_are_cached_by_alpha_level()
+    test_glow_layer_adds_overlaps_once()
+    test_car_effects_go_to_glow_layer()
+    test_particles_expire_and_compact()
+    test_particle_pool_drops_oldest_when_full()
+    test_particles_render_into_pixels()
+    test_particles_render_on_other_depths()
+    test_particles_draw_alike_on_24_and_32_bit()
+    print("All effects tests passed!")
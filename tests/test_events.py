@@ -0,0 +1,50 @@
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_bus_records_and_dispatches():
+    from events import EventBus
+    bus = EventBus(("lap", "honk"), capacity=4)
+    heard = []
+    bus.subscribe("honk", lambda *event: heard.append(event))
+    for tick in range(6):
+        bus.emit(tick, "lap" if tick % 2 else "honk", 1, 10 * tick, tick / 2)
+    assert bus.count == 0 and heard == []
+    bus.flush()
+    assert [e[0] for e in heard] == [0, 2, 4]
+    ring = bus.recent()
+    # Only the newest four fit, oldest first
+    assert ring["tick"].tolist() == [2, 3, 4, 5]
+    assert [bus.types[t] for t in ring["type"]] == ["honk", "lap", "honk", "lap"]
+    assert ring["waypoint"].tolist() == [20, 30, 40, 50]
+
+def test_simulation_events_reach_the_bus():
+    from sim import simulate_race
+    inputs = [(30, 0, "lane"), (90, 1, "lane"), (120, 0, "honk"), (200, 1, "boost")]
+    s = simulate_race("Monaco", 2, inputs, seed=3, laps=2)
+    ring = s.bus.recent()
+    kinds = [s.bus.types[t] for t in ring["type"]]
+    assert kinds.count("lane") == 2 and kinds.count("honk") == 1
+    assert kinds.count("lap") == 4 and kinds[-1] == "finish"
+    laps = ring[ring["type"] == s.bus.types.index("lap")]
+    assert abs(laps["value"][-1] - s.race.timing.last_lap[laps["car"][-1]]) < 1e-3
+    assert (ring["tick"][1:] >= ring["tick"][:-1]).all()
+
+def test_bus_exports_npz(tmp_path):
+    import numpy as np
+    from sim import simulate_race
+    s = simulate_race("Spa", 3, seed=1, laps=1)
+    path = tmp_path / "session.npz"
+    s.bus.export_npz(path, track="Spa")
+    with np.load(path) as data:
+        assert (data["events"] == s.bus.recent()).all()
+        assert tuple(data["types"]) == s.bus.types
+        assert str(data["track"]) == "Spa" and int(data["dropped"]) == 0
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_bus_records_and_dispatches()
+    test_simulation_events_reach_the_bus()
+    with tempfile.TemporaryDirectory() as d:
+        test_bus_exports_npz(Path(d))
+    print("All event bus tests passed!")
@@ -0,0 +1,102 @@
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_text_cache_hits_and_evicts():
+    import pygame
+    from hud import TextCache
+    pygame.font.init()
+    font = pygame.font.Font(None, 24)
+    cache = TextCache(limit=2)
+    a = cache.render(font, "Lap 1/5", (200, 200, 200))
+    assert cache.render(font, "Lap 1/5", (200, 200, 200)) is a
+    assert cache.render(font, "Lap 1/5", (255, 0, 0)) is not a
+    cache.render(font, "Lap 2/5", (200, 200, 200))
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.render(font, "Lap 1/5", (200, 200, 200))
+    assert cache.misses == 4
+
+def test_numbers_use_fixed_cells():
+    import pygame
+    from hud import TextCache
+    pygame.font.init()
+    font = pygame.font.Font(None, 32)
+    cache = TextCache()
+    surf = pygame.Surface((300, 50))
+    r1 = cache.blit_number(surf, font, "1:11.1", (255, 255, 255), (300, 0))
+    r2 = cache.blit_number(surf, font, "0:48.0", (255, 255, 255), (300, 0))
+    assert r1 == r2 and r1.right == 300
+    assert cache.misses == 6
+
+def test_race_hud_renders_from_cache():
+    import pygame
+    from track import Track
+    from car import Car
+    from race import RaceManager
+    from hud import HUD
+    pygame.font.init()
+    t = Track()
+    cars = [Car(i, t) for i in range(4)]
+    race = RaceManager(cars, t)
+    hud = HUD()
+    surf = pygame.Surface((1920, 1080))
+    hud.render_race(surf, race)
+    misses = hud.text.misses
+    for _ in range(5):
+        race.race_time += 0.25
+        hud.render_race(surf, race)
+    # Only new clock digits get rendered
+    assert hud.text.misses <= misses + 10
+    assert hud.text.hits > 5 * 12
+
+def test_badges_follow_drawn_poses():
+    import pygame
+    from track import Track
+    from car import Car
+    from race import RaceManager
+    from hud import HUD
+    pygame.font.init()
+    t = Track()
+    cars = [Car(i, t) for i in range(2)]
+    for _ in range(3):
+        for car in cars:
+            car.update(1 / 60)
+    race = RaceManager(cars, t)
+    surf = pygame.Surface((1920, 1080))
+    poses = [car.pose_at(0.5) for car in cars]
+    badges = HUD().render_race(surf, race, poses)[1:3]
+    assert [b.topleft for b in badges] == [(int(x) + 24, int(y) - 22) for x, y, _ in poses]
+    assert badges[0].topleft != (int(cars[0].pos[0]) + 24, int(cars[0].pos[1]) - 22)
+
+def test_hud_layers_are_reused():
+    import pygame
+    from track import Track
+    from car import Car
+    from race import RaceManager
+    from hud import HUD
+    from profiler import FrameProfiler
+    pygame.font.init()
+    t = Track()
+    cars = [Car(i, t) for i in range(3)]
+    race = RaceManager(cars, t)
+    hud = HUD()
+    surf = pygame.Surface((1920, 1080))
+    hud.render_race(surf, race)
+    race.finished_order = list(cars)
+    hud.render_finish(surf, race)
+    # Count Surfaces made while drawing the same screens again
+    prof = FrameProfiler()
+    prof.toggle()
+    for _ in range(3):
+        hud.render_race(surf, race)
+        hud.render_finish(surf, race)
+    prof.frame()
+    prof.toggle()
+    assert prof.recent()[0, -1] == 0
+
+if __name__ == "__main__":
+    test_text_cache_hits_and_evicts()
+    test_numbers_use_fixed_cells()
+    test_race_hud_renders_from_cache()
+    test_badges_follow_drawn_poses()
+    test_hud_layers_are_reused()
+    print("All HUD tests passed!")
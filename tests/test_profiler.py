@@ -0,0 +1,78 @@
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_profiler_records_nothing_while_off():
+    from profiler import FrameProfiler
+    p = FrameProfiler()
+    p.mark("cars")
+    p.frame(10)
+    assert p.count == 0
+
+def test_profiler_ring_and_stages():
+    import time
+    from profiler import FrameProfiler, PROFILE_STAGES
+    p = FrameProfiler(frames=4)
+    p.toggle()
+    for i in range(6):
+        time.sleep(0.002)
+        p.mark("cars")
+        p.mark("flip")
+        p.frame(i)
+    rows = p.recent()
+    assert len(rows) == 4
+    assert rows[:, -2].tolist() == [2, 3, 4, 5]
+    cars = 1 + PROFILE_STAGES.index("cars")
+    assert (rows[:, cars] >= 2).all()
+    assert (rows[:, 0] >= rows[:, cars]).all()
+    p50, p95, p99 = p.summary()["cars_ms"]
+    assert 2 <= p50 <= p95 <= p99
+    p.toggle()
+
+def test_profiler_counts_surfaces_and_exports(tmp_path):
+    import csv
+    import pygame
+    from profiler import FrameProfiler
+    from hud import TextCache
+    from effects import glow_stamp
+    pygame.font.init()
+    font = pygame.font.Font(None, 20)
+    text = TextCache()
+    real = pygame.Surface
+    p = FrameProfiler()
+    p.toggle()
+    assert pygame.Surface is real
+    # Counted where the game makes them: a new string and a new stamp, but
+    # not the cached string or a bare Surface
+    text.render(font, "profiled", (1, 2, 3))
+    text.render(font, "profiled", (1, 2, 3))
+    glow_stamp(7, (1, 2, 3), 99, 1)
+    pygame.Surface((4, 4))
+    p.frame(0)
+    p.toggle()
+    path = tmp_path / "frames.csv"
+    p.export_csv(path)
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 1
+    assert float(rows[0]["surfaces"]) == 2
+
+def test_sim_marks_each_stage_once():
+    from profiler import PROFILE_STAGES
+    from sim import new_race
+    from geometry import TrackGeometry
+    sim = new_race(TrackGeometry("Monza"), 4, seed=2, laps=1)
+    sim.race.started = True
+    marks = []
+    sim.step(mark=marks.append)
+    assert marks == ["car_update", "collisions", "race", "events"]
+    assert len(set(PROFILE_STAGES)) == len(PROFILE_STAGES) and set(marks) <= set(PROFILE_STAGES)
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_profiler_records_nothing_while_off()
+    test_profiler_ring_and_stages()
+    with tempfile.TemporaryDirectory() as d:
+        test_profiler_counts_surfaces_and_exports(Path(d))
+    test_sim_marks_each_stage_once()
+    print("All profiler tests passed!")
@@ -74,10 +74,125 @@ def test_shield_blocks_oil():
     assert c.slow_timer == 0
     assert not c.has_shield
 
+def test_item_atlas_has_every_frame():
+    import pygame
+    from items import item_atlas, ITEM_FRAMES, ITEM_SPRITE_SIZE
+    from sim import ITEM_TYPES
+    atlas = item_atlas()
+    assert item_atlas() is atlas
+    assert atlas.sheet.get_size() == (ITEM_SPRITE_SIZE * ITEM_FRAMES, ITEM_SPRITE_SIZE * len(ITEM_TYPES))
+    for kind in ITEM_TYPES:
+        assert len(atlas.rects[kind]) == ITEM_FRAMES
+        frame = atlas.sheet.subsurface(atlas.rects[kind][0])
+        assert frame.get_at((ITEM_SPRITE_SIZE // 2, ITEM_SPRITE_SIZE // 2)).a == 255
+
+def test_item_render_blits_from_atlas():
+    import pygame
+    from track import Track
+    from items import Item
+    t = Track()
+    from controls import WIDTH, HEIGHT
+    surf = pygame.Surface((WIDTH, HEIGHT))
+    item = Item(t, 200, 1, "boost_pickup")
+    item.render(surf)
+    x, y = int(item.pos[0]), int(item.pos[1])
+    assert surf.get_at((x, y))[:3] != (0, 0, 0)
+    item.active = False
+    surf.fill((0, 0, 0))
+    item.render(surf)
+    assert surf.get_at((x, y))[:3] == (0, 0, 0)
+
+def test_positions_use_continuous_progress():
+    from track import Track
+    from sim import CarFleet, CarState
+    from race import RaceManager
+    t = Track()
+    fleet = CarFleet(t)
+    a, b = CarState(0, t, fleet=fleet), CarState(1, t, fleet=fleet)
+    a.waypoint_idx = b.waypoint_idx = 100
+    rm = RaceManager([a, b], t)
+    assert rm.get_positions() == [a, b]
+    # Same waypoint, but b is further past it
+    fleet.progress[b.row] += 0.5
+    assert rm.get_positions() == [b, a]
+    assert (rm.position(a), rm.position(b)) == (2, 1)
+
+def test_standings_follow_a_large_race():
+    from sim import new_race
+    from geometry import TrackGeometry
+    sim = new_race(TrackGeometry("Spa"), 64, seed=5, laps=1)
+    race = sim.race
+    race.started = True
+    for tick in range(3000):
+        sim.step()
+        if tick % 97 == 0:
+            keys = race.standings()
+            expect = sorted(range(64), key=lambda i: -keys[i])
+            assert [race.cars.index(c) for c in race.get_positions()] == expect
+            assert all(race.position(c) == race.get_positions().index(c) + 1 for c in race.cars)
+        if sim.finished:
+            break
+    assert race.get_positions()[:len(race.finished_order)] == race.finished_order
+
+def test_track_sectors_from_config():
+    import pytest
+    from geometry import TRACKS, TrackGeometry
+    t = TrackGeometry("Monaco")
+    assert len(t.sector_ends) == 3 and t.sector_ends[-1] == t.num_waypoints
+    t = TrackGeometry(config=dict(TRACKS["Monaco"], sectors=[0.25, 0.5, 0.75]))
+    assert list(t.sector_ends[:-1]) == sorted(t.sector_ends[:-1])
+    assert abs(t.sector_ends[1] - t.index_at(0.5)) <= 1
+    with pytest.raises(ValueError):
+        TrackGeometry(config=dict(TRACKS["Monaco"], sectors=[0.5, 0.2]))
+
+def test_lap_times_interpolate_within_a_tick():
+    from geometry import TrackGeometry
+    from sim import CarState, Simulation
+    t = TrackGeometry("Monza")
+    laps = {}
+    for ticks_per_s in (60, 600):
+        car = CarState(0, t)
+        car.base_speed = 40.0
+        sim = Simulation(t, [car], [], laps=2)
+        sim.race.started = True
+        while not sim.finished:
+            sim.step(1 / ticks_per_s)
+        timing = sim.race.timing
+        assert not (timing.sector_times() <= 0).any()
+        assert timing.last_lap[0] == timing.splits[0, 1, -1] - timing.splits[0, 0, -1]
+        laps[ticks_per_s] = timing.splits[0].ravel()
+    # Coarse ticks land on the same crossing times as ten times finer ones
+    assert abs(laps[60] - laps[600]).max() < 1e-3
+
+def test_lap_timer_tracks_gap_and_best():
+    from geometry import TrackGeometry
+    from sim import CarFleet, CarState, Simulation
+    t = TrackGeometry("Spa")
+    fleet = CarFleet(t)
+    cars = [CarState(i, t, fleet=fleet) for i in range(2)]
+    cars[0].base_speed, cars[1].base_speed = 30.0, 28.0
+    cars[1].waypoint_idx = cars[0].waypoint_idx
+    sim = Simulation(t, cars, [], laps=3)
+    sim.race.started = True
+    for tick in range(1200):
+        sim.step()
+        if tick == 300:
+            cars[0].boost_timer = 2.0
+    timing = sim.race.timing
+    assert timing.gap[0] == 0 and timing.gap[1] > 0
+    assert timing.best_lap[0] == min(timing.last_lap[0], timing.splits[0, 0, -1])
+
 if __name__ == "__main__":
     test_race_positions()
     test_race_finish()
     test_item_boost_pickup()
     test_item_oil_slick()
     test_shield_blocks_oil()
+    test_item_atlas_has_every_frame()
+    test_item_render_blits_from_atlas()
+    test_positions_use_continuous_progress()
+    test_standings_follow_a_large_race()
+    test_track_sectors_from_config()
+    test_lap_times_interpolate_within_a_tick()
+    test_lap_timer_tracks_gap_and_best()
     print("All race/item tests passed!")
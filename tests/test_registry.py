@@ -0,0 +1,92 @@
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_track_file_round_trip(tmp_path):
+    from track import Track
+    from registry import load_track_file, save_track_file
+    from geometry import TRACKS
+    t = Track(config=dict(TRACKS["Spa"], name="Spa", sectors=[0.4, 0.7]))
+    path = tmp_path / "spa_copy.json"
+    save_track_file(path, t, include_centerline=True)
+    cfg = load_track_file(path)
+    assert cfg["name"] == "Spa"
+    assert cfg["color"] == t.color
+    t2 = Track(config=cfg)
+    assert t2.num_waypoints == t.num_waypoints
+    assert abs(t2.length - t.length) < 1
+    assert t2.sectors == (0.4, 0.7)
+
+def test_track_files_default_to_adaptive_waypoints(tmp_path):
+    import json
+    from track import TRACKS, NUM_WAYPOINTS, ADAPTIVE_CHORD_ERROR, Track
+    from registry import load_track_file, save_track_file
+    cfg = {k: v for k, v in TRACKS["Monza"].items() if k != "max_chord_error"}
+    (tmp_path / "plain.json").write_text(json.dumps(cfg))
+    (tmp_path / "even.json").write_text(json.dumps(dict(cfg, max_chord_error=None)))
+    plain = Track(config=load_track_file(tmp_path / "plain.json"))
+    even = Track(config=load_track_file(tmp_path / "even.json"))
+    assert plain.max_chord_error == ADAPTIVE_CHORD_ERROR
+    assert even.num_waypoints == NUM_WAYPOINTS
+    assert plain.num_waypoints < NUM_WAYPOINTS // 2
+    # Opting out survives a save
+    save_track_file(tmp_path / "again.json", even)
+    assert Track(config=load_track_file(tmp_path / "again.json")).num_waypoints == NUM_WAYPOINTS
+
+def test_registry_is_lazy(tmp_path):
+    import json
+    from track import TRACKS
+    from registry import TrackRegistry
+    cfg = dict(TRACKS["Monza"])
+    (tmp_path / "back_straight.json").write_text(json.dumps(cfg))
+    (tmp_path / "notes.txt").write_text("ignored")
+    reg = TrackRegistry(str(tmp_path))
+    assert len(reg) == len(TRACKS) + 1
+    info = reg.entries[len(TRACKS)]
+    assert info._config is None, "Track files should not be parsed at scan time"
+    assert info.name == "Back Straight"
+    assert info.render_mini((120, 80)).get_size() == (120, 80)
+
+def test_registry_drops_broken_files(tmp_path):
+    import json
+    import pygame
+    from track import TRACKS
+    from registry import TrackRegistry
+    from hud import HUD
+    good = dict(TRACKS["Monza"])
+    (tmp_path / "a_good.json").write_text(json.dumps(good))
+    (tmp_path / "b_not_json.json").write_text("{controls: oops")
+    (tmp_path / "c_no_colors.json").write_text(json.dumps({"controls": good["controls"]}))
+    (tmp_path / "d_good.json").write_text(json.dumps(good))
+    (tmp_path / "e_bad_sectors.json").write_text(json.dumps(dict(good, sectors=[0.7, 0.2])))
+    reg = TrackRegistry(str(tmp_path))
+    last = len(TRACKS) + 4
+    # Indexing never parses or drops anything, even for the broken last file
+    assert reg[last] is reg.entries[last] and len(reg) == last + 1
+    assert reg.validate() == 3 and reg.validate() == 0
+    assert [reg[i].path.rsplit(os.sep, 1)[1] for i in (-2, -1)] == ["a_good.json", "d_good.json"]
+    entries = list(reg.entries)
+    pygame.font.init()
+    surf = pygame.Surface((1920, 1080))
+    for idx in range(len(reg)):
+        HUD().render_track_select(surf, reg, idx)
+    assert reg.entries == entries
+    assert reg.load(len(reg) - 1).num_waypoints > 0
+
+def test_registry_load_keeps_latest():
+    from registry import TrackRegistry
+    reg = TrackRegistry("/nonexistent")
+    a = reg.load(0)
+    assert reg.load(0) is a
+    b = reg.load(1)
+    assert b.name == reg[1].name
+    assert reg.load(0) is not a
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    for test in (test_track_file_round_trip, test_track_files_default_to_adaptive_waypoints,
+                 test_registry_is_lazy, test_registry_drops_broken_files):
+        with tempfile.TemporaryDirectory() as d:
+            test(Path(d))
+    test_registry_load_keeps_latest()
+    print("All registry tests passed!")
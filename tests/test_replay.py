@@ -0,0 +1,74 @@
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _live_race(seed, inputs):
+    # Drive a race the way Game does: inputs land between fixed ticks
+    from track import Track
+    from sim import new_race, TICK
+    from replay import Replay
+    t = Track("Monaco")
+    sim = new_race(t, 3, seed, laps=2)
+    replay = Replay.for_race(t, seed, 3, 2)
+    sim.race.started = True
+    pending = list(inputs)
+    while not sim.finished:
+        while pending and pending[0][0] == sim.tick:
+            _, pid, action = pending.pop(0)
+            replay.record(sim.tick, pid, action)
+            sim.apply_input(pid, action)
+        sim.step(TICK)
+    return sim, replay
+
+def test_replay_round_trip(tmp_path):
+    from replay import save_replay, load_replay
+    _, replay = _live_race(5, [(10, 0, "lane"), (11, 2, "honk"), (700, 1, "boost")])
+    path = tmp_path / "race.wrr"
+    save_replay(path, replay)
+    back = load_replay(path)
+    assert back.inputs == replay.inputs
+    assert (back.track_name, back.seed, back.n_cars, back.laps) == ("Monaco", 5, 3, 2)
+    assert back.fingerprint == replay.fingerprint
+    assert os.path.getsize(path) == 24 + len("Monaco") + 5 * len(replay.inputs)
+
+def test_replay_resimulates_exactly():
+    from replay import Replay
+    inputs = [(t, t % 3, ("lane", "boost", "honk")[t % 3]) for t in range(20, 1500, 37)]
+    live, replay = _live_race(99, inputs)
+    again = Replay.from_bytes(replay.to_bytes()).simulate()
+    assert again.tick == live.tick
+    assert [c.player_id for c in again.race.finished_order] == [c.player_id for c in live.race.finished_order]
+    for a, b in zip(again.cars, live.cars):
+        assert (a.finish_time, a.lap, a.distance, tuple(a.pos)) == (b.finish_time, b.lap, b.distance, tuple(b.pos))
+    assert len(replay.to_bytes()) < 4096
+
+def test_replay_rejects_other_layout():
+    import pytest
+    from track import Track
+    from replay import Replay
+    r = Replay.for_race(Track("Spa"), 1, 2, 1)
+    with pytest.raises(ValueError):
+        r.simulate(Track("Spa", max_chord_error=1.0))
+
+def test_replay_rejects_corrupt_inputs():
+    import pytest
+    from track import Track
+    from replay import Replay, _INPUT
+    r = Replay.for_race(Track("Spa"), 1, 2, 1)
+    r.record(5, 1, "boost")
+    good = r.to_bytes()
+    assert Replay.from_bytes(good).inputs == [(5, 1, "boost")]
+    for packed in (1 << 2 | 3, 2 << 2 | 0):
+        with pytest.raises(ValueError):
+            Replay.from_bytes(good[:-_INPUT.size] + _INPUT.pack(5, packed))
+    with pytest.raises(ValueError):
+        Replay.from_bytes(good[:-1])
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    with tempfile.TemporaryDirectory() as d:
+        test_replay_round_trip(Path(d))
+    test_replay_resimulates_exactly()
+    test_replay_rejects_other_layout()
+    test_replay_rejects_corrupt_inputs()
+    print("All replay tests passed!")
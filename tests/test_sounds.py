@@ -0,0 +1,70 @@
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_synth_pcm_comes_from_disk_cache(tmp_path, monkeypatch):
+    import cache
+    import numpy as np
+    import sounds
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path))
+    calls = []
+
+    def tone(freq, duration=0.01):
+        calls.append(freq)
+        t = np.arange(int(sounds.SAMPLE_RATE * duration)) / sounds.SAMPLE_RATE
+        return sounds._to_pcm(np.sin(2 * np.pi * freq * t))
+
+    first = sounds.synth_pcm("tone", tone, 440)
+    assert sounds.synth_pcm("tone", tone, 440) == first
+    assert calls == [440]
+    # Interleaved 16-bit stereo, both channels equal
+    pcm = np.frombuffer(first, np.int16).reshape(-1, 2)
+    assert len(pcm) == 441 and (pcm[:, 0] == pcm[:, 1]).all()
+    sounds.synth_pcm("tone", tone, 880)
+    assert calls == [440, 880]
+    assert len(os.listdir(tmp_path / "sounds")) == 1
+
+def test_synth_pcm_rebuilds_when_generator_changes(tmp_path, monkeypatch):
+    import cache
+    import numpy as np
+    import sounds
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path))
+
+    def quiet():
+        return sounds._to_pcm(np.zeros(100))
+
+    def loud():
+        return sounds._to_pcm(np.ones(100))
+
+    assert set(sounds.synth_pcm("blip", quiet)) == {0}
+    assert set(sounds.synth_pcm("blip", loud)) != {0}
+    assert sounds.synth_pcm("blip", quiet, helpers="edited") == bytes(400)
+    assert "quiet" in sounds._source_of(quiet) and "loud" not in sounds._source_of(quiet)
+
+def test_synth_pcm_rebuilds_for_another_mixer_format(tmp_path, monkeypatch):
+    import cache
+    import numpy as np
+    import pygame
+    import sounds
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path))
+    calls = []
+
+    def blip():
+        calls.append(1)
+        return sounds._to_pcm(np.zeros(100))
+
+    for fmt in ((44100, -16, 2), (44100, -16, 2), (22050, -16, 2), (44100, 8, 1)):
+        monkeypatch.setattr(pygame.mixer, "get_init", lambda: fmt)
+        sounds.synth_pcm("blip", blip)
+    assert len(calls) == 3
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    import pytest
+    with tempfile.TemporaryDirectory() as d, pytest.MonkeyPatch.context() as mp:
+        test_synth_pcm_comes_from_disk_cache(Path(d), mp)
+    with tempfile.TemporaryDirectory() as d, pytest.MonkeyPatch.context() as mp:
+        test_synth_pcm_rebuilds_when_generator_changes(Path(d), mp)
+    with tempfile.TemporaryDirectory() as d, pytest.MonkeyPatch.context() as mp:
+        test_synth_pcm_rebuilds_for_another_mixer_format(Path(d), mp)
+    print("All sound tests passed!")
@@ -31,8 +31,170 @@ def test_lanes_are_offset():
         assert 30 < lc < 55, f"Left-center offset {lc} out of range at {i}"
         assert 30 < cr < 55, f"Center-right offset {cr} out of range at {i}"
 
+def test_waypoints_evenly_spaced():
+    from track import Track, TRACKS
+    import numpy as np
+    t = Track(config=dict(TRACKS["Spa"], max_chord_error=None))
+    assert t.num_waypoints == 600
+    closed = np.vstack([t.centerline_xy, t.centerline_xy[:1]])
+    seg = np.hypot(*np.diff(closed, axis=0).T)
+    assert seg.max() - seg.min() < 0.5, "Waypoints should be evenly spaced"
+
+def test_tuple_views_match_arrays():
+    from track import Track
+    t = Track("Monza")
+    assert t.lanes[2][42] == tuple(t.lanes_xy[2][42])
+    assert t.centerline[7] == tuple(t.centerline_xy[7])
+
+def test_baked_surface_cache(tmp_path, monkeypatch):
+    import cache
+    import pygame
+    from track import Track
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path))
+    t = Track("Suzuka")
+    screen = pygame.Surface((320, 200))
+    t.render(screen)
+    baked = pygame.image.tobytes(t._surface, "RGB")
+    calls = []
+    t2 = Track("Suzuka")
+    monkeypatch.setattr(t2, "_build_surface", lambda size: calls.append(size))
+    t2.render(screen)
+    assert not calls, "Second bake should come from the disk cache"
+    assert pygame.image.tobytes(t2._surface, "RGB") == baked
+
+def test_baked_surface_key_tracks_definition():
+    from track import Track
+    a = Track("Spa")
+    b = Track(control_points=[(x + 1, y) for x, y in a.controls])
+    assert a._surface_key((320, 200)) != a._surface_key((640, 400))
+    assert a._surface_key((320, 200)) != b._surface_key((320, 200))
+    from geometry import TRACKS
+    cfg = dict(TRACKS["Spa"], centerline=a.centerline_xy)
+    moved = dict(cfg, centerline=a.centerline_xy + (0, 3))
+    assert Track(config=cfg)._surface_key((320, 200)) != Track(config=moved)._surface_key((320, 200))
+
+def test_cache_entries_stay_in_place(tmp_path, monkeypatch):
+    import cache
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path))
+    folder = tmp_path / "tracks"
+    evil = cache.entry_path("tracks", "../../x", "k1", ".rgb")
+    assert os.path.dirname(evil) == str(folder)
+    # Names that share a prefix keep their own entries
+    cache.write(cache.entry_path("tracks", "Spa", "k1", ".rgb"), b"a")
+    cache.write(cache.entry_path("tracks", "Spa-Francorchamps", "k1", ".rgb"), b"b")
+    cache.write(cache.entry_path("tracks", "Spa?", "k1", ".rgb"), b"c")
+    assert len(os.listdir(folder)) == 3
+    cache.write(cache.entry_path("tracks", "Spa", "k2", ".rgb"), b"d")
+    assert len(os.listdir(folder)) == 3
+    assert cache.read(cache.entry_path("tracks", "Spa", "k1", ".rgb")) is None
+    assert cache.read(cache.entry_path("tracks", "Spa-Francorchamps", "k1", ".rgb")) == b"b"
+
+def test_surface_layers():
+    from track import Track, TRACK_WIDTH
+    t = Track("Silverstone")
+    surf = t._build_surface((1920, 1080))
+    half = TRACK_WIDTH // 2
+    for i in (t.index_at(0.1), t.index_at(0.4), t.index_at(0.75)):
+        c = t.centerline_xy[i]
+        n = t.normals_xy[i]
+        assert surf.get_at(tuple((c + n * 30).astype(int)))[:3] == t.tarmac_color
+        assert surf.get_at(tuple((c - n * (half + 20)).astype(int)))[:3] == (35, 85, 35)
+
+def test_kerb_stripes_close_the_loop():
+    import numpy as np
+    from track import _stripe_polygons
+    for n in (30, 33, 37, 600):
+        left = np.column_stack([np.arange(n), np.zeros(n)])
+        stripes = _stripe_polygons(left, left + (0, 1), 5)
+        # Each stripe is a run of waypoints down one edge and back the other
+        runs = [[x for x, y in poly if y == 0] for poly in stripes]
+        assert all(4 <= len(r) - 1 <= 6 for r in runs)
+        # White and red alternate, so no two white stripes touch, even
+        # across the seam where the loop closes
+        ends = {r[-1] for r in runs}
+        assert not ends & {r[0] for r in runs}
+        assert sum(len(r) - 1 for r in runs) in (n // 2, n - n // 2)
+
+def test_locate_lane_points():
+    from track import Track
+    t = Track("Monaco")
+    i = t.index_at(0.23)
+    for lane in range(3):
+        x, y = t.lanes[lane][i]
+        idx, found_lane, offset, distance = t.locate(x, y)
+        assert idx == i
+        assert found_lane == lane
+        assert abs(offset - (lane - 1) * 40) < 1
+        assert abs(distance - t.distances[i]) < 5
+
+def test_locate_many_matches_brute_force():
+    from track import Track
+    import numpy as np
+    t = Track("Suzuka")
+    pts = np.random.default_rng(1).uniform((0, 0), (1920, 1080), (5000, 2))
+    idx, lane, offset, distance = t.locate_many(pts)
+    d = np.hypot(pts[:, None, 0] - t.centerline_xy[:, 0], pts[:, None, 1] - t.centerline_xy[:, 1])
+    assert np.allclose(d[np.arange(len(pts)), idx], d.min(axis=1))
+    assert ((lane >= 0) & (lane <= 2)).all()
+    assert ((distance >= 0) & (distance < t.length)).all()
+
+def test_adaptive_waypoints():
+    from track import Track, TRACKS, TRACK_NAMES, _chaikin
+    import numpy as np
+    # Built-in tracks sample adaptively, well under the uniform 600 points
+    for name in TRACK_NAMES:
+        even = Track(config=dict(TRACKS[name], max_chord_error=None))
+        assert even.num_waypoints == 600
+        assert Track(name).num_waypoints < even.num_waypoints // 2
+    uniform = Track(config=dict(TRACKS["Monza"], max_chord_error=None))
+    t = Track("Monza")
+    assert abs(t.length - uniform.length) < 5
+    for lane in t.lanes:
+        assert len(lane) == t.num_waypoints
+    # Every point of the smooth curve stays close to the sampled polyline
+    smooth = _chaikin(t.controls, iterations=5)
+    a = t.centerline_xy
+    b = np.roll(a, -1, axis=0)
+    ab = b - a
+    rel = smooth[:, None, :] - a[None]
+    u = np.clip((rel * ab).sum(-1) / (ab * ab).sum(-1), 0, 1)
+    err = np.hypot(*(rel - u[..., None] * ab).transpose(2, 0, 1)).min(axis=1)
+    assert err.max() < 1.0
+
+def test_index_at_uniform():
+    from track import Track
+    t = Track()
+    assert [t.index_at(k / 600) for k in range(0, 600, 7)] == list(range(0, 600, 7))
+
+def test_render_mini_is_cached():
+    from track import Track, THUMBNAIL_CACHE_SIZE
+    t = Track("Monaco")
+    mini = t.render_mini((280, 150))
+    assert t.render_mini((280, 150)) is mini
+    for w in range(THUMBNAIL_CACHE_SIZE + 2):
+        t.render_mini((100 + w, 60))
+    assert len(t._thumbnails) == THUMBNAIL_CACHE_SIZE
+    assert t.render_mini((280, 150)) is not mini
+
 if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    import pytest
     test_track_creation()
     test_waypoints_form_closed_loop()
     test_lanes_are_offset()
+    test_waypoints_evenly_spaced()
+    test_tuple_views_match_arrays()
+    with tempfile.TemporaryDirectory() as d, pytest.MonkeyPatch.context() as mp:
+        test_baked_surface_cache(Path(d), mp)
+    test_baked_surface_key_tracks_definition()
+    with tempfile.TemporaryDirectory() as d, pytest.MonkeyPatch.context() as mp:
+        test_cache_entries_stay_in_place(Path(d), mp)
+    test_surface_layers()
+    test_kerb_stripes_close_the_loop()
+    test_locate_lane_points()
+    test_locate_many_matches_brute_force()
+    test_adaptive_waypoints()
+    test_index_at_uniform()
+    test_render_mini_is_cached()
     print("All track tests passed!")